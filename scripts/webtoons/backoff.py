@@ -0,0 +1,72 @@
+import random
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+# statuses worth another try, anything else is a real answer from the server.
+RETRY_STATUSES = frozenset((408, 425, 429, 500, 502, 503, 504))
+
+
+class Backoff:
+    """Exponential backoff with full jitter: the n-th retry waits a random
+    time between 0 and min(`maximum`, `base` * `factor` ** n) seconds.
+    """
+    def __init__(self, base: float = 0.5, factor: float = 2, maximum: float = 30, jitter: bool = True):
+        self.base = base
+        self.factor = factor
+        self.maximum = maximum
+        self.jitter = jitter
+
+    def delay(self, attempt: int) -> float:
+        delay = min(self.maximum, self.base * self.factor ** attempt)
+        if self.jitter:
+            return random.uniform(0, delay)
+        return delay
+
+
+def retry_after(headers: Mapping[str, str], maximum: float = 120) -> Optional[float]:
+    """Return the delay in seconds requested by a `Retry-After` header
+    (either a number of seconds or an http date), capped to `maximum`.
+    """
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            date = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        delay = (date - datetime.now(timezone.utc)).total_seconds()
+    return min(max(delay, 0), maximum)
+
+
+class RetryBudget:
+    """Limit the retries on a domain to `minimum` plus `ratio` of the
+    requests made on it, so a site that is down does not get hammered
+    with retries of every single page.
+    """
+    def __init__(self, ratio: float = 0.2, minimum: int = 10):
+        self.ratio = ratio
+        self.minimum = minimum
+        self._requests: Dict[str, int] = {}
+        self._retries: Dict[str, int] = {}
+
+    def deposit(self, domain: str) -> None:
+        self._requests[domain] = self._requests.get(domain, 0) + 1
+
+    def withdraw(self, domain: str) -> bool:
+        """return True if a retry is allowed on `domain` (and account for it)
+        """
+        allowance = self.minimum + self.ratio * self._requests.get(domain, 0)
+        retries = self._retries.get(domain, 0)
+        if retries >= allowance:
+            return False
+        self._retries[domain] = retries + 1
+        return True
+
+
+retry_budget = RetryBudget()
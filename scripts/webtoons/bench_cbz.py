@@ -0,0 +1,59 @@
+"""Compare the archive size and the pack time of a chapter between the
+historical "deflate everything" cbz and the default CompressionPolicy.
+
+usage: python bench_cbz.py [sample.cbz]
+without a sample a synthetic chapter of jpeg-like pages is used.
+"""
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from typing import List, Tuple
+
+from cbz import CbzWriter, CompressionPolicy, DeflateAll
+
+
+def synthetic_chapter(pages: int = 60, page_size: int = 400_000) -> List[Tuple[str, bytes]]:
+    # jpeg payloads are entropy coded, random bytes behave the same way
+    # when they go through deflate.
+    entries = [
+        (f'{index:03}.jpg', b'\xff\xd8\xff\xe0' + os.urandom(page_size) + b'\xff\xd9')
+        for index in range(pages)
+    ]
+    entries.append(('ComicInfo.xml', b'<ComicInfo><Series>bench</Series></ComicInfo>\n' * 50))
+    return entries
+
+
+def load_chapter(path: str) -> List[Tuple[str, bytes]]:
+    with zipfile.ZipFile(path) as cbz:
+        return list([(name, cbz.read(name)) for name in cbz.namelist()])
+
+
+def pack(entries: List[Tuple[str, bytes]], policy: CompressionPolicy, folder: str, rounds: int = 3) -> Tuple[int, float]:
+    """return the size of the archive and the best pack time over `rounds`
+    """
+    filename = os.path.join(folder, 'bench.cbz')
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter()
+        with CbzWriter(filename, policy) as cbz:
+            for name, data in entries:
+                cbz.write(name, data)
+            cbz.save()
+        best = min(best, time.perf_counter() - start)
+    return os.path.getsize(filename), best
+
+
+def main() -> None:
+    entries = load_chapter(sys.argv[1]) if len(sys.argv) > 1 else synthetic_chapter()
+    raw_size = sum(len(data) for _, data in entries)
+    print(f'{len(entries)} entries, {raw_size / 1e6:.1f} MB of raw data')
+    with tempfile.TemporaryDirectory() as folder:
+        for label, policy in (('deflate all', DeflateAll()), ('policy', CompressionPolicy())):
+            size, elapsed = pack(entries, policy, folder)
+            print(f'{label:>12}: {size / 1e6:8.2f} MB {elapsed * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
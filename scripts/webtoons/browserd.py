@@ -0,0 +1,84 @@
+"""Keep a chrome running with a persistent profile for the selenium providers,
+the leech runs attach to it instead of launching their own browser:
+
+    python browserd.py --port 9222 &
+    export WEBTOONS_BROWSERD=127.0.0.1:9222
+
+The browser is restarted whenever it dies, waiting longer and longer if it
+keeps crashing right after its start.
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from typing import List
+
+import undetected_chromedriver as uc
+
+from backoff import Backoff
+from browsers import EXTENSIONS_PATHS
+
+
+def chrome_command(port: int, profile: str, headless: bool) -> List[str]:
+    command = [
+        uc.find_chrome_executable(),
+        f'--remote-debugging-port={port}',
+        f'--user-data-dir={profile}',
+        '--disable-gpu',
+        '--no-first-run',
+        '--no-service-autorun',
+        '--password-store=basic',
+    ]
+    if headless:
+        command.append('--headless=new')
+    for extenssion in EXTENSIONS_PATHS:
+        command.append(f'--load-extension={extenssion}')
+    return command
+
+
+def supervise(command: List[str], min_uptime: float = 30, max_delay: float = 60) -> None:
+    backoff = Backoff(base=1, maximum=max_delay, jitter=False)
+    crashes = 0
+    while True:
+        started = time.monotonic()
+        process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        print(f'Chrome started (pid {process.pid})')
+        try:
+            code = process.wait()
+        except BaseException:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+            raise
+        crashes = crashes + 1 if time.monotonic() - started < min_uptime else 0
+        delay = backoff.delay(crashes)
+        print(f'Chrome exited with code {code}, restarting in {delay:.0f}s')
+        time.sleep(delay)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Persistent chrome for the selenium providers')
+    parser.add_argument('--port', type=int, default=9222)
+    parser.add_argument(
+        '--profile',
+        default=os.path.expanduser('~/.cache/webtoons/browserd'),
+        help='user data dir, keeps the cache, cookies and extensions state'
+    )
+    parser.add_argument('--headless', action='store_true')
+    args = parser.parse_args()
+    os.makedirs(args.profile, exist_ok=True)
+    # stop chrome with us when killed
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f'export WEBTOONS_BROWSERD=127.0.0.1:{args.port}')
+    try:
+        supervise(chrome_command(args.port, args.profile, args.headless))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
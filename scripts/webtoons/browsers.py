@@ -0,0 +1,225 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
+
+import undetected_chromedriver as uc
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.remote.webelement import WebElement
+
+from runscope import RunScoped
+
+EXTENSIONS_PATHS = [
+    '/usr/lib/ublock-origin'
+]
+
+# "host:port" of the chrome kept warm by `browserd.py`
+BROWSERD_ENV = 'WEBTOONS_BROWSERD'
+
+
+def new_marionette(headless: bool = False) -> uc.Chrome:
+    print('Requesting a new marionette')
+    options = uc.ChromeOptions()
+    if headless:
+        options.headless = True
+        options.add_argument('--headless')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--no-first-run --no-service-autorun --password-store=basic')
+    for extenssion in EXTENSIONS_PATHS:
+        options.add_argument(f'--load-extension={extenssion}')
+    driver = uc.Chrome(options=options)
+    print('Got new marionette.')
+    return driver
+
+
+class AttachedChrome(webdriver.Chrome):
+    """Marionette driving the chrome of the browser daemon from a tab of its
+    own, quitting only closes that tab: the browser and its profile (cache,
+    cookies, extensions) stay warm for the next runs.
+    """
+    def quit(self) -> None:
+        try:
+            self.close()
+        except WebDriverException:
+            pass
+        super().quit()
+
+
+def attach_marionette(address: str) -> AttachedChrome:
+    print(f'Attaching to the browser daemon at {address}')
+    options = webdriver.ChromeOptions()
+    options.debugger_address = address
+    # the same patched chromedriver as the launched marionettes
+    patcher = uc.Patcher()
+    patcher.auto()
+    driver = AttachedChrome(service=Service(patcher.executable_path), options=options)
+    driver.switch_to.new_window('tab')
+    return driver
+
+
+def get_marionette(headless: bool = False) -> webdriver.Chrome:
+    """Attach to the browser daemon when `WEBTOONS_BROWSERD` is set and it
+    answers, launch a new chrome otherwise.
+    """
+    address = os.environ.get(BROWSERD_ENV)
+    if address:
+        try:
+            return attach_marionette(address)
+        except (WebDriverException, OSError) as error:
+            print(f'Cannot attach to the browser daemon: {error}')
+    return new_marionette(headless)
+
+
+class AsyncDriver:
+    """Async facade over a marionette: its commands run on a thread dedicated
+    to this browser, so the event loop (and the http downloads of the other
+    toons) keeps going while the browser loads a page.
+    Use `run` for anything not covered by the shortcuts, a function doing
+    several commands in a row (like looking at a list of elements) should be
+    run as a whole rather than command by command.
+    """
+    def __init__(self, driver: webdriver.Chrome):
+        self.driver = driver
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='marionette')
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def get(self, url: str) -> None:
+        await self.run(self.driver.get, url)
+
+    async def current_url(self) -> str:
+        return await self.run(lambda: self.driver.current_url)
+
+    async def page_source(self) -> str:
+        return await self.run(lambda: self.driver.page_source)
+
+    async def find_element(self, by: str, value: str) -> WebElement:
+        return await self.run(self.driver.find_element, by, value)
+
+    async def find_elements(self, by: str, value: str) -> List[WebElement]:
+        return await self.run(self.driver.find_elements, by, value)
+
+    async def execute_script(self, script: str, *args) -> Any:
+        return await self.run(self.driver.execute_script, script, *args)
+
+    async def get_cookies(self) -> List[Dict[str, Any]]:
+        return await self.run(self.driver.get_cookies)
+
+    def shutdown(self) -> None:
+        _async_drivers.pop(self.driver, None)
+        self._executor.shutdown(wait=False)
+
+
+# the facades hold their driver, they are dropped by `AsyncDriver.shutdown`
+_async_drivers: Dict[webdriver.Chrome, AsyncDriver] = {}
+
+
+def async_driver(driver: webdriver.Chrome) -> AsyncDriver:
+    """Return the `AsyncDriver` of `driver`, one (and one thread) per browser.
+    """
+    facade = _async_drivers.get(driver)
+    if facade is None:
+        facade = AsyncDriver(driver)
+        _async_drivers[driver] = facade
+    return facade
+
+
+class PooledBrowser:
+    """A marionette owned by the `BrowserPool`, `pages` counts the pages it
+    loaded so it can be recycled before it grows too fat.
+    """
+    def __init__(self, driver: webdriver.Chrome, headless: bool = True):
+        self.driver = driver
+        self.headless = headless
+        self.pages = 0
+
+    def healthy(self) -> bool:
+        try:
+            self.driver.current_url
+            return True
+        except WebDriverException:
+            return False
+
+    def quit(self) -> None:
+        try:
+            self.driver.quit()
+        except WebDriverException:
+            pass
+
+
+class BrowserPool(RunScoped):
+    """Bounded pool of marionettes for the selenium toons.
+
+    A toon gets a browser started with its own `_headless` setting (some
+    challenges only pass in a visible browser), `headless` is the default
+    of the pool. The pool holds at most `size` browsers (by default as many as fit in
+    `memory_budget` MB, counting `browser_memory` MB each), a browser is
+    checked out for a whole toon, health checked when it comes back into use
+    and recycled after `max_pages` page loads.
+    The browsers are all closed when the last `async with browser_pool:`
+    block exits.
+    """
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        max_pages: int = 200,
+        memory_budget: int = 2048,
+        browser_memory: int = 512,
+        headless: bool = True,
+        factory: Callable[[bool], webdriver.Chrome] = get_marionette
+    ):
+        self.size = size or max(1, memory_budget // browser_memory)
+        self.max_pages = max_pages
+        self.headless = headless
+        self.factory = factory
+        self._idle: List[PooledBrowser] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def _get_browser(self, headless: bool) -> PooledBrowser:
+        while True:
+            matching = list([browser for browser in self._idle if browser.headless == headless])
+            if not matching:
+                break
+            browser = matching[-1]
+            self._idle.remove(browser)
+            if browser.pages < self.max_pages and await async_driver(browser.driver).run(browser.healthy):
+                return browser
+            await self._quit(browser)
+        if self._idle:
+            # only idle browsers of the other kind, make room for the new one
+            await self._quit(self._idle.pop(0))
+        # starting chrome takes a few seconds, keep the loop running meanwhile
+        return PooledBrowser(await asyncio.to_thread(self.factory, headless), headless)
+
+    @asynccontextmanager
+    async def checkout(self, headless: Optional[bool] = None) -> AsyncGenerator[PooledBrowser, None]:
+        async with self._semaphore:
+            browser = await self._get_browser(self.headless if headless is None else headless)
+            try:
+                yield browser
+            finally:
+                self._idle.append(browser)
+
+    async def open(self) -> None:
+        self._semaphore = asyncio.Semaphore(self.size)
+
+    async def close(self) -> None:
+        browsers = list(self._idle)
+        self._idle.clear()
+        for browser in browsers:
+            await self._quit(browser)
+
+    @staticmethod
+    async def _quit(browser: PooledBrowser) -> None:
+        facade = async_driver(browser.driver)
+        await facade.run(browser.quit)
+        facade.shutdown()
+
+
+browser_pool = BrowserPool()
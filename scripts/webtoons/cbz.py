@@ -0,0 +1,115 @@
+import asyncio
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional, Tuple
+
+from dirindex import dir_index
+from images import sniff
+
+# read once: os.umask can only be read by setting it
+UMASK = os.umask(0)
+os.umask(UMASK)
+
+
+class CompressionPolicy:
+    """Decide how each entry of a cbz is stored: images that are already
+    compressed (jpeg, png, webp...) are stored as is since deflate would burn
+    cpu for nothing, anything else (bmp, metadata...) is deflated at `level`.
+    """
+    stored_formats: Tuple[str, ...] = ('jpeg', 'png', 'webp', 'gif', 'avif')
+
+    def __init__(self, level: int = 6, stored_formats: Optional[Iterable[str]] = None):
+        self.level = level
+        if stored_formats is not None:
+            self.stored_formats = tuple(stored_formats)
+
+    def compression(self, filename: str, data: bytes) -> Tuple[int, Optional[int]]:
+        """return the (compress_type, compresslevel) to use for this entry
+        """
+        if sniff(data) in self.stored_formats:
+            return zipfile.ZIP_STORED, None
+        return zipfile.ZIP_DEFLATED, self.level
+
+
+class DeflateAll(CompressionPolicy):
+    """Deflate every entry, whatever it contains (the historical behaviour).
+    """
+    stored_formats = ()
+
+
+class CbzWriter:
+    """Stream the pages of a chapter into a temporary file next to
+    `filename`, the archive only appears under its real name once `save`
+    succeeded, otherwise the temporary file is removed.
+
+    usage:
+    ```python
+    with CbzWriter(path) as cbz:
+        cbz.write('000.jpg', data)
+        cbz.save()
+    ```
+    """
+    def __init__(self, filename: str, policy: Optional[CompressionPolicy] = None):
+        self.filename = filename
+        self.policy = policy or CompressionPolicy()
+        fd, self.tmp_filename = tempfile.mkstemp(
+            dir=os.path.dirname(filename) or '.',
+            prefix='.',
+            suffix='.cbz.part'
+        )
+        self.fp = os.fdopen(fd, 'wb')
+        self.cbz = zipfile.ZipFile(self.fp, 'w', zipfile.ZIP_DEFLATED)
+        self.saved = False
+        # one thread per archive keeps its entries in order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='cbz')
+
+    def __str__(self) -> str:
+        return self.filename
+
+    def __enter__(self) -> "CbzWriter":
+        return self
+
+    def __exit__(self, *_) -> None:
+        if not self.saved:
+            self.discard()
+
+    def exists(self) -> bool:
+        return dir_index.exists(self.filename)
+
+    def write(self, filename: str, data: bytes) -> None:
+        compress_type, level = self.policy.compression(filename, data)
+        self.cbz.writestr(filename, data, compress_type=compress_type, compresslevel=level)
+
+    async def write_async(self, filename: str, data: bytes) -> None:
+        """`write` from the archive's own thread: the writes to the library's
+        mount and the deflate (zlib releases the GIL) happen off the loop.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.write, filename, data)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        self.cbz.close()
+        if not self.fp.closed:
+            self.fp.flush()
+            os.fsync(self.fp.fileno())
+            self.fp.close()
+
+    def save(self) -> None:
+        self.close()
+        # mkstemp creates the file as 0600, give it the mode open() would
+        os.chmod(self.tmp_filename, 0o666 & ~UMASK)
+        os.replace(self.tmp_filename, self.filename)
+        self.saved = True
+        dir_index.add(self.filename)
+
+    def discard(self) -> None:
+        try:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self.cbz.close()
+            self.fp.close()
+        finally:
+            if os.path.exists(self.tmp_filename):
+                os.unlink(self.tmp_filename)
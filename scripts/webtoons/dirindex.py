@@ -0,0 +1,64 @@
+import fnmatch
+import os
+from glob import glob
+from typing import Dict, Set
+
+from runscope import RunScoped
+
+
+class DirectoryIndex(RunScoped):
+    """Per run index of the content of the toons folders: each folder is
+    listed once with `scandir` and the presence checks are then answered
+    from memory, the cbz committed during the run are added as they land.
+    The library lives on a network mount where every stat is a round trip.
+
+    Outside of a run (`async with dir_index:`) every check goes to the
+    filesystem.
+    """
+    def __init__(self):
+        self._folders: Dict[str, Set[str]] = {}
+
+    def listdir(self, path: str) -> Set[str]:
+        path = os.path.normpath(path)
+        names = self._folders.get(path)
+        if names is None:
+            try:
+                with os.scandir(path) as entries:
+                    # skip the `CbzWriter` files still being written
+                    names = set([
+                        entry.name for entry in entries
+                        if not (entry.name.startswith('.') and entry.name.endswith('.part'))
+                    ])
+            except (FileNotFoundError, NotADirectoryError):
+                names = set()
+            if self.active:
+                self._folders[path] = names
+        return names
+
+    def exists(self, filename: str) -> bool:
+        if not self.active:
+            return os.path.exists(filename)
+        folder, name = os.path.split(filename)
+        return name in self.listdir(folder or '.')
+
+    def match(self, path: str, pattern: str) -> bool:
+        """Tell if a file of the folder `path` matches the glob `pattern`.
+        """
+        if not self.active:
+            return bool(glob(os.path.join(path, pattern)))
+        return any(fnmatch.filter(self.listdir(path), pattern))
+
+    def add(self, filename: str) -> None:
+        folder, name = os.path.split(filename)
+        names = self._folders.get(os.path.normpath(folder or '.'))
+        if names is not None:
+            names.add(name)
+
+    def clear(self) -> None:
+        self._folders.clear()
+
+    async def close(self) -> None:
+        self.clear()
+
+
+dir_index = DirectoryIndex()
@@ -0,0 +1,152 @@
+import struct
+from io import BytesIO
+from typing import Callable, Dict, Optional
+
+
+class TruncatedImageError(Exception):
+    """The data starts like a known image format but its container is
+    incomplete, most likely a half-downloaded page.
+    """
+
+
+def sniff(data: bytes) -> Optional[str]:
+    """Return the image format of `data` from its magic bytes or None if it
+    is not a known format.
+    """
+    if data.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if data.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'webp'
+    if data[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if data[4:12] in (b'ftypavif', b'ftypavis'):
+        return 'avif'
+    if data.startswith(b'BM'):
+        return 'bmp'
+    return None
+
+
+def _trailing(data: bytes) -> bytes:
+    # some servers pad the files with nulls or new lines, ignore them.
+    return data.rstrip(b'\x00\r\n ')
+
+
+def _jpeg_is_complete(data: bytes) -> bool:
+    # walk the segments headers until the start of scan, the entropy coded
+    # data that follows has no length so we only look for the EOI marker
+    # (0xff is always escaped in that data), anything after it is ignored.
+    position = 2
+    while position + 4 <= len(data):
+        if data[position] != 0xff:
+            return False
+        marker = data[position + 1]
+        if marker == 0xff:
+            position += 1
+            continue
+        if marker == 0xda:
+            return data.find(b'\xff\xd9', position) != -1
+        if 0xd0 <= marker <= 0xd7 or marker in (0x01, 0xd8):
+            position += 2
+            continue
+        length = struct.unpack('>H', data[position + 2:position + 4])[0]
+        position += 2 + length
+    return False
+
+
+def _png_is_complete(data: bytes) -> bool:
+    position = 8
+    first = True
+    while position + 8 <= len(data):
+        length, chunk_type = struct.unpack('>I4s', data[position:position + 8])
+        if first and (chunk_type != b'IHDR' or length != 13):
+            return False
+        first = False
+        position += 12 + length
+        if chunk_type == b'IEND':
+            return position <= len(data)
+    return False
+
+
+def _webp_is_complete(data: bytes) -> bool:
+    size = struct.unpack('<I', data[4:8])[0]
+    return data[12:16] in (b'VP8 ', b'VP8L', b'VP8X') and size + 8 <= len(data)
+
+
+def _gif_is_complete(data: bytes) -> bool:
+    return _trailing(data).endswith(b'\x3b')
+
+
+def _avif_is_complete(data: bytes) -> bool:
+    # top level ISO-BMFF boxes: 32 bits size (1: 64 bits size follows,
+    # 0: until the end of file) then the box type. The image is complete
+    # once its `meta` and `mdat` boxes are, anything after is ignored.
+    position = 0
+    boxes = set()
+    while position + 8 <= len(data):
+        size, box_type = struct.unpack('>I4s', data[position:position + 8])
+        if size == 0:
+            return True
+        if size == 1:
+            if position + 16 > len(data):
+                return False
+            size = struct.unpack('>Q', data[position + 8:position + 16])[0]
+        if size < 8:
+            return False
+        position += size
+        if position > len(data):
+            return False
+        boxes.add(box_type)
+        if {b'meta', b'mdat'} <= boxes:
+            return True
+    return False
+
+
+def _bmp_is_complete(data: bytes) -> bool:
+    return len(data) >= 6 and struct.unpack('<I', data[2:6])[0] <= len(data)
+
+
+CHECKERS: Dict[str, Callable[[bytes], bool]] = {
+    'jpeg': _jpeg_is_complete,
+    'png': _png_is_complete,
+    'webp': _webp_is_complete,
+    'gif': _gif_is_complete,
+    'avif': _avif_is_complete,
+    'bmp': _bmp_is_complete,
+}
+
+
+def decode(data: bytes, full: bool = True) -> bool:
+    """Open `data` with PIL, with `full` the whole image is decoded which
+    catches any corruption but costs as much as displaying it.
+    """
+    from PIL import Image
+
+    try:
+        image = Image.open(BytesIO(data))
+        if full:
+            image.load()
+        return True
+    except Exception:
+        return False
+
+
+def check_image(data: bytes, strict: bool = False) -> bool:
+    """Return True if `data` looks like a complete image, False if it is not
+    an image at all (an html error page for instance).
+    Only the headers and the container structure are checked unless `strict`
+    is set, in which case the image is also fully decoded.
+
+    raises:
+    - TruncatedImageError if the image is known but incomplete
+    """
+    image_format = sniff(data)
+    if image_format is None:
+        # not a format we know the structure of, let PIL have a lazy look.
+        return decode(data, full=strict)
+    if not CHECKERS[image_format](data):
+        raise TruncatedImageError(f'incomplete {image_format} ({len(data)} bytes)')
+    if strict:
+        return decode(data)
+    return True
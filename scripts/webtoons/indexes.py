@@ -0,0 +1,126 @@
+"""Create and check the indexes declared by the documents (`Mongo.indexes`)
+and explain the queries the leechers run all the time:
+
+    python indexes.py mongodb://192.168.1.12/webtoons            # report the missing ones
+    python indexes.py mongodb://192.168.1.12/webtoons --create
+    python indexes.py mongodb://192.168.1.12/webtoons --explain
+"""
+import argparse
+import asyncio
+from typing import Any, Dict, Iterator, List, Tuple, Type
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from motorized import Document, Q, QuerySet, connection
+from pymongo import IndexModel
+
+import providers  # noqa: F401 (declares the documents of the providers)
+from toonbase import AsyncToon, ToonManager
+
+
+def documents(base: Type[Document] = Document) -> Iterator[Type[Document]]:
+    for document in base.__subclasses__():
+        yield document
+        yield from documents(document)
+
+
+def declared_indexes() -> Dict[str, Dict[str, IndexModel]]:
+    """Return the indexes declared by all the documents, by collection and
+    index name.
+    """
+    indexes: Dict[str, Dict[str, IndexModel]] = {}
+    for document in documents():
+        for index in getattr(document.Mongo, 'indexes', []):
+            indexes.setdefault(document.Mongo.collection, {})[index.document['name']] = index
+    return indexes
+
+
+async def missing_indexes(collection: AsyncIOMotorCollection, declared: Dict[str, IndexModel]) -> List[IndexModel]:
+    """The declared indexes not in `collection`, an index with the same keys
+    but another name is as good.
+    """
+    existing = await collection.index_information()
+    existing_keys = set([tuple(info['key']) for info in existing.values()])
+    return list([
+        index for index in declared.values()
+        if tuple(index.document['key'].items()) not in existing_keys
+    ])
+
+
+def hot_queries() -> Iterator[Tuple[str, QuerySet]]:
+    unfinished = Q(finished=False) | Q(finished__exists=False)
+    for document in documents():
+        if not getattr(document.Mongo, 'filters', None):
+            continue
+        name = document.__name__
+        yield f'{name} unfinished', document.objects.filter(unfinished)
+        if issubclass(document, AsyncToon):
+            # the episodes of the toon prefetched by `AsyncToon.leech`, on the
+            # domain_name_episode prefix
+            yield f'{name} name', document.objects.filter(name='')
+            yield f'{name} next=None', document.objects.filter(next=None)
+        else:
+            yield f'{name} name+lang', document.objects.filter(name='', lang='')
+
+
+def plan_stages(plan: Any) -> List[str]:
+    """Flatten the stages of an explained plan (`IXSCAN name_lang`...)
+    """
+    stages: List[str] = []
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            stages.append(' '.join(filter(None, [plan['stage'], plan.get('indexName')])))
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for value in plan:
+            stages.extend(plan_stages(value))
+    return stages
+
+
+async def explain(queryset: QuerySet) -> List[str]:
+    cursor = await queryset.find()
+    plan = await cursor.explain()
+    return plan_stages(plan['queryPlanner']['winningPlan'])
+
+
+async def explain_lasts(queryset: ToonManager) -> List[str]:
+    plan = await connection.database.command(
+        'aggregate',
+        queryset.collection.name,
+        pipeline=queryset.lasts_pipeline(),
+        explain=True
+    )
+    return plan_stages(plan.get('stages', plan))
+
+
+def report(description: str, stages: List[str]) -> None:
+    warning = ' <- collection scan' if any(stage.startswith('COLLSCAN') for stage in stages) else ''
+    print(f'{description:40} {" > ".join(reversed(stages))}{warning}')
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description='Manage the indexes of the toons collections')
+    parser.add_argument('url', help='mongodb url, including the database')
+    parser.add_argument('--create', action='store_true', help='create the missing indexes')
+    parser.add_argument('--explain', action='store_true', help='show the plans of the hot queries')
+    args = parser.parse_args()
+    await connection.connect(args.url)
+
+    for collection_name, declared in declared_indexes().items():
+        collection = connection.database[collection_name]
+        missing = await missing_indexes(collection, declared)
+        for index in missing:
+            print(f'{collection_name}: missing {index.document["name"]} {dict(index.document["key"])}')
+        if missing and args.create:
+            created = await collection.create_indexes(missing)
+            print(f'{collection_name}: created {", ".join(created)}')
+
+    if args.explain:
+        for description, queryset in hot_queries():
+            report(description, await explain(queryset))
+            if isinstance(queryset, ToonManager) and description.endswith('unfinished'):
+                report(description + ' lasts', await explain_lasts(queryset))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import Dict, NamedTuple, Optional, TextIO
+
+# where the journals are kept, on the local disk (not on the library's mount)
+JOURNAL_ENV = 'WEBTOONS_JOURNAL'
+
+
+def journal_root() -> str:
+    return os.environ.get(JOURNAL_ENV) or os.path.expanduser('~/.cache/webtoons/journal')
+
+
+class JournalEntry(NamedTuple):
+    url: str
+    filename: str
+    checksum: str
+
+
+class PageJournal:
+    """Pages of a chapter already fetched, kept on the local disk until its
+    cbz is saved so an interrupted pull resumes at the missing pages.
+
+    Each page is written in the journal's folder then recorded in
+    `journal.jsonl` (url, filename and sha256 of the content), a page whose
+    url or checksum does not match any more is fetched again.
+    """
+    def __init__(self, cbz_path: str, root: Optional[str] = None):
+        key = hashlib.sha1(cbz_path.encode()).hexdigest()
+        self.path = os.path.join(root or journal_root(), key)
+        self.entries: Dict[str, JournalEntry] = {}
+        self._fp: Optional[TextIO] = None
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __enter__(self) -> "PageJournal":
+        self.open()
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    @property
+    def index_path(self) -> str:
+        return os.path.join(self.path, 'journal.jsonl')
+
+    def open(self) -> None:
+        os.makedirs(self.path, exist_ok=True)
+        try:
+            with open(self.index_path) as fp:
+                for line in fp:
+                    try:
+                        entry = JournalEntry(**json.loads(line))
+                    except (ValueError, TypeError):
+                        # the last line may have been cut by a crash
+                        continue
+                    self.entries[entry.filename] = entry
+        except FileNotFoundError:
+            pass
+        self._fp = open(self.index_path, 'a')
+
+    def get(self, filename: str, url: str) -> Optional[bytes]:
+        """Return the content of the page if it has already been fetched.
+        """
+        entry = self.entries.get(filename)
+        if entry is None or entry.url != url:
+            return None
+        try:
+            with open(os.path.join(self.path, filename), 'rb') as fp:
+                data = fp.read()
+        except OSError:
+            return None
+        if hashlib.sha256(data).hexdigest() != entry.checksum:
+            return None
+        return data
+
+    def record(self, filename: str, url: str, data: bytes) -> None:
+        page_path = os.path.join(self.path, filename)
+        with open(page_path + '.part', 'wb') as fp:
+            fp.write(data)
+        os.replace(page_path + '.part', page_path)
+        entry = JournalEntry(url, filename, hashlib.sha256(data).hexdigest())
+        self._fp.write(json.dumps(entry._asdict()) + '\n')
+        self._fp.flush()
+        self.entries[filename] = entry
+
+    def close(self) -> None:
+        if self._fp is None:
+            return
+        self._fp.flush()
+        os.fsync(self._fp.fileno())
+        self._fp.close()
+        self._fp = None
+
+    def discard(self) -> None:
+        """Drop the journal, once the cbz is saved.
+        """
+        self.close()
+        shutil.rmtree(self.path, ignore_errors=True)
+        self.entries.clear()
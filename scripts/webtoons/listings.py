@@ -0,0 +1,60 @@
+import asyncio
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from pydantic import BaseModel
+
+from runscope import RunScoped
+
+
+class ListingCache(RunScoped):
+    """Memoize the chapters listings of the providers for the duration of a
+    run, concurrent callers asking for the same listing share the same
+    in-flight fetch so each listing is fetched at most once per sweep.
+
+    Outside of a run (`async with listings:`) every call fetches.
+    """
+    def __init__(self):
+        self._entries: Dict[Hashable, asyncio.Future] = {}
+
+    async def get(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.active:
+            return await factory()
+        future = self._entries.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._entries[key] = future
+        # a cancelled caller must not cancel the fetch of the others
+        return await asyncio.shield(future)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def close(self) -> None:
+        self.clear()
+
+
+listings = ListingCache()
+
+
+def memoize_listing(func: Callable) -> Callable:
+    """Cache the result of a toon's listing method in `listings`, keyed by
+    provider, toon and arguments. Each caller gets its own copy of the
+    chapters since they will be attached to the caller's toon.
+    """
+    @wraps(func)
+    async def wrapper(self, *args, **kwargs) -> Any:
+        key = (
+            type(self).__qualname__,
+            self.domain,
+            self.name,
+            getattr(self, 'lang', None),
+            func.__name__,
+            args,
+            tuple(sorted(kwargs.items())),
+        )
+        result = await listings.get(key, lambda: func(self, *args, **kwargs))
+        if isinstance(result, list):
+            return list([item.copy() if isinstance(item, BaseModel) else item for item in result])
+        return result
+    return wrapper
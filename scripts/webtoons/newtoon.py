@@ -1,15 +1,15 @@
 import asyncio
+import hashlib
 import os
 import re
 import ssl
 import sys
-import zipfile
 from contextlib import asynccontextmanager
 from datetime import datetime
 from functools import wraps
-from io import BytesIO
 from textwrap import wrap
-from typing import (Any, AsyncGenerator, Callable, Coroutine, Dict, List,
+from time import monotonic
+from typing import (Any, AsyncGenerator, Callable, Coroutine, Dict, List, Mapping,
                     Optional, Tuple, Type, Union)
 
 import aiohttp
@@ -18,34 +18,75 @@ from asyncio_pool import AioPool
 from bs4 import BeautifulSoup
 from motorized import (Document, EmbeddedDocument, Field, PrivatesAttrsMixin,
                        Q, QuerySet)
-from PIL import Image, UnidentifiedImageError
 from pydantic import HttpUrl, validator
+from pymongo import ASCENDING, IndexModel
 from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webelement import WebElement
+
+from backoff import Backoff
+from browsers import AsyncDriver, PooledBrowser, async_driver, browser_pool, get_marionette
+from cbz import CbzWriter, CompressionPolicy
+from dirindex import dir_index
+from images import TruncatedImageError
+from journal import PageJournal
+from ratelimit import rate_limiter, request_host
+from scheduler import LeechScheduler, leech_run
+from sessions import Clearance, FetchResult, ToonSession, sessions
+from workers import validate_page
 
 FIREFOX = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:93.0) Gecko/20100101 Firefox/93.0'
 CHROME_LINUX = 'Mozilla/5.0 (X11; Linux x86_64; rv:89.0) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 CHROME = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/95.0.4638.54 Safari/537.36'
 
+# milliseconds since the last change of the DOM, the observer is installed
+# on the first call for each document.
+DOM_QUIET_SCRIPT = '''
+if (window.__toonLastMutation === undefined) {
+    window.__toonLastMutation = performance.now();
+    new MutationObserver(() => { window.__toonLastMutation = performance.now(); })
+        .observe(document, {childList: true, subtree: true, attributes: true, characterData: true});
+}
+return performance.now() - window.__toonLastMutation;
+'''
+
+# milliseconds since the last resource of the page finished loading, -1 while
+# the document itself is still loading.
+NETWORK_IDLE_SCRIPT = '''
+if (document.readyState !== 'complete') return -1;
+const ends = performance.getEntriesByType('resource').map(entry => entry.responseEnd);
+return performance.now() - Math.max(performance.timing.loadEventEnd - performance.timeOrigin, ...ends);
+'''
+
 
 def raise_on_any_error_from_pool(pool_result: List[Optional[Exception]]):
     errors = list(filter(None, pool_result))
     for error in errors:
-        if isinstance(error, Exception):
+        # the pool hands back a cancelled page (ctrl+c) as its result
+        if isinstance(error, BaseException):
             raise error
 
 
 def retry(count: int, *exceptions: List[Type[Exception]], delay: int = 0):
+    """Retry the decorated coroutine up to `count` times when it raises one
+    of `exceptions`, waiting an exponential backoff (with jitter) starting at
+    `delay` seconds between tries.
+    Any other exception, or the last one once the retries are exhausted,
+    is raised back to the caller.
+    """
+    backoff = Backoff(base=delay)
+
     def wrapper(func):
         @wraps(func)
         async def decorator(*args, **kwargs):
             for retry_index in range(count + 1):
                 try:
                     return await func(*args, **kwargs)
-                except Exception as error:
-                    if type(error) in exceptions:
-                        if delay:
-                            await asyncio.sleep(delay)
-                        continue
+                except exceptions:
+                    if retry_index == count:
+                        raise
+                    if delay:
+                        await asyncio.sleep(backoff.delay(retry_index))
         return decorator
     return wrapper
 
@@ -64,80 +105,210 @@ def error_handler(error: Type[Exception], message: Optional[str] = None):
     return decorator
 
 
-class InMemoryZipFile:
-    def __init__(self, filename: str):
-        self.io = BytesIO()
-        self.cbz = zipfile.ZipFile(self.io, 'w', zipfile.ZIP_DEFLATED)
-        self.filename = filename
-
-    def __str__(self) -> str:
-        return self.filename
-
-    def exists(self) -> bool:
-        return os.path.exists(self.filename)
-
-    def write(self, filename: str, data: bytes) -> None:
-        self.cbz.writestr(filename, data)
-
-    def close(self):
-        self.cbz.close()
-
-    def save(self) -> None:
-        self.close()
-        self.io.seek(0)
-        with open(self.filename, 'wb') as fp:
-            fp.write(self.io.read())
-
-
 class SeleniumMixin:
     _driver: Optional[Union[webdriver.Firefox, webdriver.Chrome]] = None
     _headless: bool = False
 
+    _browser: Optional[PooledBrowser] = None
+
+    # solve the challenges in the marionette then fetch the pages over plain
+    # http with its cookies and user agent, see `handoff`
+    _browser_handoff: bool = False
+
+    # what a loaded page waits for before being used, see `wait_ready`
+    _ready: Optional[str] = None
+    _ready_quiet: float = 0
+    _ready_timeout: float = 15
+    _poll_interval: float = 0.25
+
     @classmethod
-    def get_new_marionette(cls, headless: bool = False) -> uc.Chrome:
-        print('Requesting a new marionette')
-        options = uc.ChromeOptions()
-        if headless:
-            options.headless = True
-            options.add_argument('--headless')
-        options.add_argument('--disable-gpu')
-        options.add_argument('--no-first-run --no-service-autorun --password-store=basic')
-        extenssions_paths = [
-            '/usr/lib/ublock-origin'
-        ]
-        for extenssion in extenssions_paths:
-            options.add_argument(f'--load-extension={extenssion}')
-        driver = uc.Chrome(options=options)
-        print('Got new marionette.')
-        return driver
+    def get_new_marionette(cls, headless: bool = False) -> webdriver.Chrome:
+        return get_marionette(headless)
 
     @property
     def driver(self) -> Union[webdriver.Firefox, webdriver.Chrome]:
+        # a browser checked out from the pool for this toon takes precedence
+        if self._browser:
+            return self._browser.driver
         if not self._driver:
             # self._driver = webdriver.Firefox()
             # self._driver = webdriver.Chrome()
             self._driver = self.get_new_marionette(self._headless)
         return self._driver
 
+    @property
+    def browser(self) -> AsyncDriver:
+        """The marionette behind an async facade, its commands run on a thread
+        dedicated to this browser.
+        """
+        return async_driver(self.driver)
+
+    async def navigate(self, url: str, ready: bool = True) -> None:
+        """Load `url` in the marionette, within the domain's rate limit, then
+        wait for the page to be ready (see `wait_ready`).
+        """
+        await self.throttle()
+        await self.browser.get(url)
+        if self._browser:
+            self._browser.pages += 1
+        if ready:
+            await self.wait_ready()
+
+    async def wait_until(self, predicate: Callable[[], Any], timeout: float = 10) -> Any:
+        """Poll `predicate` every `_poll_interval` seconds until it returns
+        something truthy, which is returned. The predicate is run on the
+        browser's thread so it can use the driver directly.
+
+        raises:
+        - asyncio.TimeoutError after `timeout` seconds
+        """
+        deadline = monotonic() + timeout
+        while True:
+            result = await self.browser.run(predicate)
+            if result:
+                return result
+            if monotonic() >= deadline:
+                url = await self.browser.current_url()
+                raise asyncio.TimeoutError(f'{url} not ready after {timeout}s')
+            await asyncio.sleep(self._poll_interval)
+
+    async def wait_for_selector(self, selector: str, timeout: float = 10, visible: bool = False) -> WebElement:
+        """Wait for an element matching the css `selector` (and displayed if
+        `visible`) to be in the page, return it.
+        """
+        def find() -> Optional[WebElement]:
+            for element in self.driver.find_elements(By.CSS_SELECTOR, selector):
+                if not visible or element.is_displayed():
+                    return element
+            return None
+        return await self.wait_until(find, timeout)
+
+    async def wait_for_dom_quiet(self, quiet: float = 0.5, timeout: float = 10) -> None:
+        """Wait for the DOM to stay unchanged for `quiet` seconds, for the
+        pages populated by scripts.
+        """
+        await self.wait_until(
+            lambda: self.driver.execute_script(DOM_QUIET_SCRIPT) >= quiet * 1000,
+            timeout
+        )
+
+    async def wait_for_network_idle(self, idle: float = 0.5, timeout: float = 10) -> None:
+        """Wait for the page to be loaded and no resource (xhr included) to
+        have completed for `idle` seconds.
+        """
+        await self.wait_until(
+            lambda: self.driver.execute_script(NETWORK_IDLE_SCRIPT) >= idle * 1000,
+            timeout
+        )
+
+    async def wait_ready(self) -> None:
+        """Wait for what the provider declared: the `_ready` css selector
+        and/or `_ready_quiet` seconds without any DOM change.
+        """
+        if self._ready:
+            await self.wait_for_selector(self._ready, self._ready_timeout)
+        if self._ready_quiet:
+            await self.wait_for_dom_quiet(self._ready_quiet, self._ready_timeout)
+
     async def parse_url(self, url: str, delay: int = 0) -> BeautifulSoup:
         """The `delay` parameter wait for the page to load/execute the scripts
         in the marionette, some websites require that otherwise the JS don't
         have the time to populate divs/lists.
         """
-        if url != self.driver.current_url:
-            self.driver.get(url)
-        return BeautifulSoup(self.driver.page_source, 'lxml')
+        result = await self.fetch_cleared(url)
+        if result:
+            return BeautifulSoup(result.body, 'lxml')
+        if url != await self.browser.current_url():
+            await self.navigate(url)
+        page = BeautifulSoup(await self.browser.page_source(), 'lxml')
+        await self.handoff(page)
+        return page
+
+    async def parse_listing(self, url: str, method: str = 'get') -> BeautifulSoup:
+        """The marionette can't send conditional requests, so only the digest
+        of the page source tells if the listing changed.
+
+        raises:
+        - ListingUnchanged
+        """
+        result = await self.fetch_cleared(url, method)
+        if result:
+            self.update_listing(url, result.body, result.headers)
+            return BeautifulSoup(result.body, 'lxml')
+        if url != await self.browser.current_url():
+            await self.navigate(url)
+        page_source: str = await self.browser.page_source()
+        page = BeautifulSoup(page_source, 'lxml')
+        await self.handoff(page)
+        self.update_listing(url, page_source.encode())
+        return page
 
     async def parse_cloudflare_url(self, url: str, delay: int = 0) -> BeautifulSoup:
-        self.driver.get(url)
-        for index in range(20):
-            await asyncio.sleep(delay)
-            page = BeautifulSoup(self.driver.page_source, 'lxml')
-            # print(f'{index:02}: {self.driver.current_url}')
-            challenge_form = page.find('form', {'class': 'challenge-form'})
-            if not challenge_form:
-                return page
-            await asyncio.sleep(8)
+        """Load `url` and wait for the challenge (if any) to be passed, then
+        give the scripts up to `delay` seconds to populate the page.
+
+        raises:
+        - asyncio.TimeoutError if the challenge is still there after 3 minutes
+        """
+        result = await self.fetch_cleared(url)
+        if result:
+            return BeautifulSoup(result.body, 'lxml')
+        await self.navigate(url, ready=False)
+        await self.wait_until(
+            lambda: not self.driver.find_elements(By.CSS_SELECTOR, 'form.challenge-form'),
+            timeout=180
+        )
+        await self.wait_ready()
+        if delay:
+            try:
+                await self.wait_for_dom_quiet(timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+        page = BeautifulSoup(await self.browser.page_source(), 'lxml')
+        await self.handoff(page)
+        return page
+
+    @staticmethod
+    def is_challenge(page: BeautifulSoup) -> bool:
+        return page.find('form', {'class': 'challenge-form'}) is not None
+
+    async def handoff(self, page: BeautifulSoup) -> None:
+        """Once the marionette got a real page (not a challenge), hand its
+        cookies and user agent over to the http sessions of the domain so the
+        next pages and images can be fetched without the browser.
+        """
+        if not self._browser_handoff or self.is_challenge(page):
+            return
+        cookies = await self.browser.get_cookies()
+        expires = [
+            cookie['expiry'] for cookie in cookies
+            if cookie['name'] == 'cf_clearance' and 'expiry' in cookie
+        ]
+        sessions.set_clearance(self.domain, Clearance(
+            cookies={cookie['name']: cookie['value'] for cookie in cookies},
+            user_agent=await self.browser.execute_script('return navigator.userAgent;'),
+            expires=min(expires) if expires else None,
+        ))
+
+    async def fetch_cleared(self, url: str, method: str = 'get') -> Optional[FetchResult]:
+        """Fetch `url` over http with the clearance handed over by the
+        marionette, return None when there is none or when the site asks for
+        a new challenge (the clearance is then revoked) so the caller can
+        fall back to the browser.
+        """
+        if not self._browser_handoff or not sessions.clearance(self.domain):
+            return None
+        async with self.get_client() as client:
+            try:
+                result = await client.fetch_response(url, method, retries=0)
+            except aiohttp.ClientResponseError as error:
+                if error.status not in (403, 503):
+                    raise
+                result = None
+        if result is None or b'challenge-form' in result.body:
+            sessions.revoke_clearance(self.domain)
+            return None
+        return result
 
     async def post_cloudflare_challenge(self, page: BeautifulSoup) -> None:
         challenge_form = page.find('form', {'class': 'challenge-form'})
@@ -146,7 +317,7 @@ class SeleniumMixin:
         payload = dict({
             field['name']: field['value'] for field in challenge_inputs if field.get('value', None)
         })
-        cookies = self.driver.get_cookies()
+        cookies = await self.browser.get_cookies()
         print('POST', challenge_link, payload, cookies)
 
 
@@ -200,6 +371,27 @@ class Chapter(PrivatesAttrsMixin, EmbeddedDocument):
     episode: Optional[int]
     _parent: Optional["WebToonPacked"]
 
+    class Config:
+        # a chapter is validated once, when it is scraped, not each time it
+        # goes into a toon.
+        copy_on_model_validation = 'none'
+
+    @classmethod
+    def from_mongo(cls, data: Dict[str, Any]) -> "Chapter":
+        """Trusted construction for the chapters coming from the database,
+        they have been validated (and their name cleaned) when scraped.
+        """
+        # what `construct` does, minus the bookkeeping we do not need
+        values = {
+            name: data[name] if name in data else field.get_default()
+            for name, field in cls.__fields__.items()
+        }
+        chapter = cls.__new__(cls)
+        object.__setattr__(chapter, '__dict__', values)
+        object.__setattr__(chapter, '__fields_set__', set(values))
+        chapter._init_private_attributes()
+        return chapter
+
     @validator('episode', pre=True)
     def validate_episode(cls, value: Optional[Union[int, str]]) -> Optional[int]:
         if isinstance(value, str):
@@ -230,7 +422,7 @@ class Chapter(PrivatesAttrsMixin, EmbeddedDocument):
         return os.path.join(self._parent.path, self.name.strip() + '.cbz')
 
     def exists(self) -> bool:
-        return os.path.exists(self.cbz_path)
+        return dir_index.exists(self.cbz_path)
 
     async def pull(self, pool_size: int = 3) -> bool:
         """
@@ -250,44 +442,57 @@ class Chapter(PrivatesAttrsMixin, EmbeddedDocument):
             return False
 
         pool = AioPool(pool_size)
-        cbz = InMemoryZipFile(self.cbz_path)
-
-        async with self._parent.get_client() as client:
-            async def download_coroutine(pair: Tuple[str, str]) -> bool:
-                """return True if the file has been downloaded, False otherwise
-                may raise errors that will be present in results
-                """
-                filename, url = pair
-                # Download the page
-                response = await client.get(url, ssl=self._parent.ssl_context)
-                response.raise_for_status()
-
-                # Save the page content to the cbz file
-                page_content: bytes = await response.read()
-                if not await self.is_valid_page_content(page_content):
+        # the pages already fetched by an interrupted pull are taken back from the journal
+        with PageJournal(self.cbz_path) as journal, CbzWriter(self.cbz_path, self._parent._compression) as cbz:
+            if len(journal):
+                self.log(f'(resuming, {len(journal)} pages fetched) ', end='')
+            async with self._parent.get_client() as client:
+                async def download_coroutine(pair: Tuple[str, str]) -> bool:
+                    """return True if the file has been downloaded, False otherwise
+                    may raise errors that will be present in results
+                    """
+                    filename, url = pair
+                    page_content = journal.get(filename, url)
+                    if page_content is not None:
+                        valid = await self.validate_page(page_content)
+                    else:
+                        # Download the page (transient errors are retried by fetch)
+                        page_content = await client.fetch(url, ssl=self._parent.ssl_context)
+
+                        try:
+                            valid = await self.validate_page(page_content)
+                        except TruncatedImageError:
+                            # the transfer was cut, give the page one more chance
+                            page_content = await client.fetch(url, ssl=self._parent.ssl_context)
+                            valid = await self.validate_page(page_content)
+                        if valid:
+                            journal.record(filename, url, page_content)
+                    if not valid:
+                        return False
+                    # Save the page content to the cbz file
+                    await cbz.write_async(filename, page_content)
+                    self._progress()
+                    return True
+
+                result = await pool.map(download_coroutine, pair_list)
+                raise_on_any_error_from_pool(result)
+                if not any(result):
+                    journal.discard()
+                    self.log('Empty, removed')
                     return False
-                cbz.write(filename, page_content)
-                self._progress()
-                return True
-
-            result = await pool.map(download_coroutine, pair_list)
-            raise_on_any_error_from_pool(result)
-            if not any(result):
-                self.log('Empty, removed')
-                return False
-        cbz.save()
+            cbz.save()
+            journal.discard()
         self.log('\n', end='')
         return True
 
-    async def is_valid_page_content(self, page_content: bytes) -> bool:
-        """return True if the page content seems to be a valid image
-        False otherwise
+    async def validate_page(self, page_content: bytes) -> bool:
+        """return False if the page content does not look like an image,
+        only the headers are checked unless the toon has `_strict_pages` set.
+
+        raises:
+        - images.TruncatedImageError if the page is incomplete
         """
-        try:
-            image = Image.open(BytesIO(page_content))
-            return True
-        except UnidentifiedImageError:
-            return False
+        return await validate_page(page_content, self._parent._strict_pages)
 
     async def get_pages_urls(self) -> List[HttpUrl]:
         raise NotImplementedError
@@ -329,11 +534,56 @@ class Chapter(PrivatesAttrsMixin, EmbeddedDocument):
         return self.episode == other.episode
 
 
+class ListingState(EmbeddedDocument):
+    """What we got the last time the listing page of a toon has been parsed.
+    """
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    digest: Optional[str]
+
+
+class ListingUnchanged(Exception):
+    """The listing page of the toon did not change since the last sweep.
+    """
+
+
+class ChaptersConflict(Exception):
+    """The chapters of the toon changed in the database since it was loaded.
+    """
+
+
 class ToonManager(QuerySet):
-    async def leech(self, pool_size: int = 1, driver: Optional[uc.Chrome] = None) -> list[Exception]:
-        errors: list[Exception] = []
-        # we want to iterate over all toons that are not explictly finished.
-        async for toon in self.filter(Q(finished=False) | Q(finished__exists=False)):
+    async def leech(
+        self,
+        pool_size: int = 1,
+        driver: Optional[uc.Chrome] = None,
+        workers: int = 8,
+        per_domain: int = 2
+    ) -> list[Exception]:
+        # selenium toons each take a marionette from the browser pool, unless
+        # a `driver` is given: they then share it and run one after another.
+        scheduler = LeechScheduler(
+            workers,
+            per_domain,
+            limits={'selenium': 1 if driver else browser_pool.size}
+        )
+
+        def keys(toon: "WebToonPacked") -> List[str]:
+            if isinstance(toon, SeleniumMixin):
+                return [toon.domain, 'selenium']
+            return [toon.domain]
+
+        async def leech_toon(toon: "WebToonPacked") -> None:
+            nonlocal driver
+            if isinstance(toon, SeleniumMixin) and not driver and not toon._driver:
+                async with browser_pool.checkout(toon._headless) as browser:
+                    toon._browser = browser
+                    try:
+                        await toon.leech(pool_size)
+                    finally:
+                        toon._browser = None
+                return
             # if this can have a driver
             if isinstance(toon, SeleniumMixin):
                 # and the driver in toon is set but not in global, we set it
@@ -344,9 +594,62 @@ class ToonManager(QuerySet):
                     toon._driver = driver
             try:
                 await toon.leech(pool_size)
-            except Exception as error:
-                errors.append(error)
-        return errors
+            finally:
+                # keep the marionette the toon may have started for the next ones
+                if isinstance(toon, SeleniumMixin) and not driver:
+                    driver = toon._driver
+
+        # we want to iterate over all toons that are not explictly finished.
+        toons = self.filter(Q(finished=False) | Q(finished__exists=False))
+        async with leech_run():
+            return await scheduler.run(toons.light(), leech_toon, keys)
+
+    async def light(self) -> AsyncGenerator["WebToonPacked", None]:
+        """Stream the toons with only the name and episode of their chapters,
+        enough to tell which ones are missing on disk, except for the last
+        one which is loaded whole for `nexts`.
+        The full chapters are fetched by `WebToonPacked.load_chapters` when
+        one of them has to be downloaded.
+        """
+        pipeline: List[Dict[str, Any]] = []
+        if not self._query.is_empty():
+            pipeline.append({'$match': self._query.query})
+        pipeline.append({'$addFields': {
+            'last_chapter': {'$arrayElemAt': ['$chapters', -1]},
+            'chapters': {'$map': {
+                'input': '$chapters',
+                'as': 'chapter',
+                'in': {'name': '$$chapter.name', 'episode': '$$chapter.episode'},
+            }},
+        }})
+        async for raw_data in self.collection.aggregate(pipeline):
+            yield self.model.from_light(raw_data)
+
+    # the documents read from the database go through `WebToonPacked.from_mongo`
+
+    async def __aiter__(self) -> AsyncGenerator["WebToonPacked", None]:
+        cursor = await self.find()
+        async for raw_data in cursor:
+            yield self.model.from_mongo(raw_data)
+
+    async def first(self) -> Optional["WebToonPacked"]:
+        raw_data = await self.find_one()
+        if raw_data is None:
+            return None
+        return self.model.from_mongo(raw_data)
+
+    async def get(self, **kwargs) -> "WebToonPacked":
+        queryset = self.filter(**kwargs)
+        cursor = await queryset.find()
+        try:
+            raw_data = await cursor.__anext__()
+        except StopAsyncIteration as error:
+            raise self.model.DocumentNotFound(queryset._query.query) from error
+        try:
+            await cursor.__anext__()
+        except StopAsyncIteration:
+            return self.model.from_mongo(raw_data)
+        raise self.model.TooManyMatchException
 
     async def drop(self):
         # prevent droping the whole table, just drop the current filtering
@@ -368,14 +671,34 @@ class WebToonPacked(Document):
     gender: Optional[str]
     corporate: bool = True
     chapters: List[Chapter] = []
+    listing: Optional[ListingState] = None
     # inner use, for futures developement.
     version: int = 2
 
     _quote_cookies: bool = False
     _lowerize_headers: bool = False
+    _compression: CompressionPolicy = CompressionPolicy()
+    # fully decode each page instead of only checking its headers
+    _strict_pages: bool = False
+    # requests per second allowed on the domain (None: unlimited)
+    _rate_limit: Optional[float] = None
+    _rate_burst: int = 1
+    # requests per second allowed on each other host (images cdn...)
+    _cdn_rate_limit: Optional[float] = None
+    _listing_changed: bool = False
+    # listing state seen during this sweep, kept apart until the chapters
+    # have been successfully parsed from it.
+    _next_listing: Optional[ListingState] = None
+    # only the name and episode of the chapters are loaded, see `light`
+    _partial: bool = False
 
     class Mongo:
         manager_class = ToonManager
+        # see indexes.py
+        indexes = [
+            IndexModel([('domain', ASCENDING), ('finished', ASCENDING)], name='domain_finished'),
+            IndexModel([('name', ASCENDING), ('lang', ASCENDING)], name='name_lang'),
+        ]
 
     def __str__(self):
         return self.name
@@ -398,29 +721,133 @@ class WebToonPacked(Document):
         if not os.path.exists(self.path):
             os.mkdir(self.path)
 
+    @classmethod
+    def chapter_class(cls) -> Type[Chapter]:
+        return cls.__fields__['chapters'].type_
+
+    @classmethod
+    def from_mongo(cls, raw_data: Dict[str, Any]) -> "WebToonPacked":
+        """Build a toon from its document, the chapters come from the database
+        and go through the trusted `Chapter.from_mongo` instead of being
+        validated again (the rest of the toon still is).
+        """
+        raw_chapters = raw_data.pop('chapters', [])
+        toon = cls(**raw_data, chapters=[])
+        chapter_class = cls.chapter_class()
+        chapters = list([chapter_class.from_mongo(chapter) for chapter in raw_chapters])
+        # skip the validation of the whole list on assignment
+        object.__setattr__(toon, 'chapters', chapters)
+        return toon
+
+    @classmethod
+    def from_light(cls, raw_data: Dict[str, Any]) -> "WebToonPacked":
+        """Build a toon from a document of `ToonManager.light`.
+        """
+        last_chapter = raw_data.pop('last_chapter', None)
+        chapters = raw_data.pop('chapters', [])[:-1]
+        if last_chapter:
+            chapters.append(last_chapter)
+        toon = cls.from_mongo({**raw_data, 'chapters': chapters})
+        toon._partial = True
+        return toon
+
+    async def load_chapters(self) -> None:
+        """Replace the light chapters by the full ones from the database,
+        the chapters added since the toon was loaded are kept.
+        """
+        if not self._partial:
+            return
+        raw_data = await self.objects.collection.find_one({'_id': self.id}, {'chapters': True})
+        chapter_class = self.chapter_class()
+        chapters = list([chapter_class.from_mongo(chapter) for chapter in raw_data.get('chapters', [])])
+        chapters.extend(self.chapters[len(chapters):])
+        for chapter in chapters:
+            chapter._parent = self
+        object.__setattr__(self, 'chapters', chapters)
+        self._partial = False
+
     async def save(self, *args, **kwargs):
+        # never write the light chapters over the real ones
+        await self.load_chapters()
         self.updated = datetime.utcnow()
+        self._listing_changed = False
         return await super().save(*args, **kwargs)
 
+    def commit_listing(self) -> None:
+        """Adopt the listing state seen during this sweep, to call once the
+        chapters have been parsed from it.
+        """
+        if self._next_listing is None:
+            return
+        self.listing = self._next_listing
+        self._next_listing = None
+        self._listing_changed = True
+
+    async def save_listing(self) -> None:
+        """Only persist the listing state, if it changed.
+        """
+        if not self._listing_changed or self.id is None:
+            return
+        await self.objects.collection.update_one(
+            {'_id': self.id},
+            {'$set': {'listing': self.listing.dict()}}
+        )
+        self._listing_changed = False
+
+    async def push_chapters(self, chapters: List[Chapter]) -> None:
+        """Append the new `chapters` (already in `self.chapters`) in the
+        database without rewriting the others, along with `updated` and the
+        listing state. The update only applies if the toon still has the
+        chapters it had when it was loaded.
+
+        raises:
+        - ChaptersConflict if the chapters changed in the meantime
+        """
+        if self.id is None:
+            await self.save()
+            return
+        self.updated = datetime.utcnow()
+        fields = {'updated': self.updated}
+        if self._listing_changed:
+            fields['listing'] = self.listing.dict()
+        result = await self.objects.collection.update_one(
+            {'_id': self.id, 'chapters': {'$size': len(self.chapters) - len(chapters)}},
+            {
+                '$push': {'chapters': {'$each': [chapter.dict() for chapter in chapters]}},
+                '$set': fields,
+            }
+        )
+        if not result.matched_count:
+            raise ChaptersConflict(self.name)
+        self._listing_changed = False
+
     async def leech(self, pool_size: int = 1):
         await self.create_folder()
         print(f'--- {self.name} ---')
         # check for missing chapters on local
         for chapter in self.chapters:
             chapter._parent = self
+        if self._partial and not all(chapter.exists() for chapter in self.chapters):
+            await self.load_chapters()
+        for chapter in self.chapters:
             await chapter.pull(pool_size)
 
         if not self.chapters:
             return
-        nexts = await self.chapters[-1].nexts()
+        try:
+            nexts = await self.chapters[-1].nexts()
+        except ListingUnchanged:
+            nexts = []
+        self.commit_listing()
         if not nexts:
+            await self.save_listing()
             return
 
         self.chapters.extend(nexts)
         for chapter in nexts:
             chapter._parent = self
             await chapter.pull(pool_size)
-        await self.save()
+        await self.push_chapters(nexts)
 
     def get_headers(self) -> Dict[str, str]:
         headers = {
@@ -444,27 +871,91 @@ class WebToonPacked(Document):
 
     @asynccontextmanager
     async def get_client(self):
+        headers = self.get_headers()
+        cookies = self.get_cookies()
+        # a browser went through the site's challenge for us, impersonate it
+        clearance = sessions.clearance(self.domain)
+        if clearance:
+            headers = {**headers, 'User-Agent': clearance.user_agent}
+            cookies = {**(cookies or {}), **clearance.cookies}
+        # inside a run we reuse the domain's session to keep connections alive
+        if sessions.active:
+            yield sessions.client(
+                self.domain,
+                headers,
+                cookies,
+                self._quote_cookies,
+                self.throttle
+            )
+            return
         session = aiohttp.ClientSession(
-            headers=self.get_headers(),
-            cookie_jar=self.get_cookie_jar(),
+            headers=headers,
+            cookie_jar=self.get_cookie_jar(cookies),
         )
         async with session as client:
-            yield client
+            yield ToonSession(client, throttle=self.throttle, domain=self.domain)
+
+    async def throttle(self, url: Optional[str] = None) -> None:
+        """Wait for the rate limit of the request's host (`_rate_limit`
+        requests per second with bursts of `_rate_burst` on the domain,
+        `_cdn_rate_limit` on the other hosts), must be awaited before any
+        request.
+        """
+        host = request_host(url, self.domain)
+        rate = self._rate_limit if host == self.domain else self._cdn_rate_limit
+        await rate_limiter.acquire(host, rate, self._rate_burst)
 
     async def parse_url(self, url: str, method: str = 'get') -> BeautifulSoup:
         async with self.get_client() as client:
-            func = getattr(client, method)
-            request = func(url)
-            async with request as response:
-                response.raise_for_status()
-                page_content = await response.read()
+            page_content = await client.fetch(url, method)
         page = BeautifulSoup(page_content, 'lxml')
         return page
 
-    def get_cookie_jar(self) -> aiohttp.CookieJar:
+    def update_listing(self, url: str, body: bytes, headers: Mapping[str, str] = {}) -> None:
+        """Record the state of the listing page we just got, it is only
+        adopted by `commit_listing`.
+
+        raises:
+        - ListingUnchanged if its content is the same as the last time
+        """
+        previous = self.listing
+        state = ListingState(
+            url=url,
+            etag=headers.get('ETag'),
+            last_modified=headers.get('Last-Modified'),
+            digest=hashlib.sha256(body).hexdigest(),
+        )
+        if state != previous:
+            self._next_listing = state
+        if previous and previous.url == url and previous.digest == state.digest:
+            raise ListingUnchanged(url)
+
+    async def parse_listing(self, url: str, method: str = 'get') -> BeautifulSoup:
+        """Same as `parse_url` for the listing page of the toon, the request
+        is conditional (ETag / Last-Modified) and the content is compared to
+        the one of the previous sweep to skip the parsing when possible.
+
+        raises:
+        - ListingUnchanged
+        """
+        headers = {}
+        if self.listing and self.listing.url == url:
+            if self.listing.etag:
+                headers['If-None-Match'] = self.listing.etag
+            if self.listing.last_modified:
+                headers['If-Modified-Since'] = self.listing.last_modified
+        async with self.get_client() as client:
+            result = await client.fetch_response(url, method, headers=headers)
+        if result.status == 304:
+            raise ListingUnchanged(url)
+        self.update_listing(url, result.body, result.headers)
+        return BeautifulSoup(result.body, 'lxml')
+
+    def get_cookie_jar(self, cookies: Optional[Dict] = None) -> aiohttp.CookieJar:
         loop = aiohttp.helpers.get_running_loop()
         jar = aiohttp.CookieJar(loop=loop, unsafe=True, quote_cookie=self._quote_cookies)
-        cookies: Optional[Dict] = self.get_cookies()
+        if cookies is None:
+            cookies = self.get_cookies()
         if cookies is not None:
             jar.update_cookies(cookies)
         return jar
@@ -2,6 +2,7 @@ from typing import List, Optional
 from pydantic import Field
 from motorized import Q, mark_parents
 from newtoon import Chapter, WebToonPacked, ToonManager, SeleniumMixin
+from listings import memoize_listing
 from undetected_chromedriver import Chrome
 
 
@@ -24,8 +25,8 @@ class BugPlayerChapter(Chapter):
         return list(filter(None, [unwrap_link(div.find('a')) for div in divs]))
 
     async def nexts(self) -> List["BugPlayerChapter"]:
-        instance = await self._parent.from_scratch()
-        return list(filter(lambda chapter: chapter > self, instance.chapters))
+        chapters = await self._parent.get_chapters()
+        return list(filter(lambda chapter: chapter > self, chapters))
 
 
 class BugPlayer(SeleniumMixin, WebToonPacked):
@@ -42,8 +43,9 @@ class BugPlayer(SeleniumMixin, WebToonPacked):
     def url(self):
         return 'https://bug-player.com/'
 
+    @memoize_listing
     async def get_chapters(self) -> List[BugPlayerChapter]:
-        page = await self.parse_url(self.url)
+        page = await self.parse_listing(self.url)
         chapter_div = page.find('div', {'id': 'Chapters_List'})
         lis = chapter_div.find_all('li')
 
@@ -2,6 +2,7 @@ from typing import List, Optional
 
 from motorized import Document, QuerySet, Q, mark_parents
 from newtoon import Chapter, WebToonPacked, ToonManager
+from listings import memoize_listing
 
 
 class LelScanChapter(Chapter):
@@ -27,10 +28,8 @@ class LelScanChapter(Chapter):
         ])
 
     async def nexts(self) -> List["LelScanChapter"]:
-        instance = await self._parent.from_name(self._parent.name)
-        chapters = list(filter(lambda chapter: chapter > self, instance.chapters))
-        mark_parents(instance, self)
-        return chapters
+        chapters = await self._parent.discover_chapters()
+        return list(filter(lambda chapter: chapter > self, chapters))
 
 
 class LelScan(WebToonPacked):
@@ -47,8 +46,9 @@ class LelScan(WebToonPacked):
     def url(self) -> str:
         return f'https://www.lelscan-vf.cc/manga/{self.name}'
 
+    @memoize_listing
     async def discover_chapters(self) -> List[LelScanChapter]:
-        page = await self.parse_url(self.url)
+        page = await self.parse_listing(self.url)
         h5s = page.find_all('h5', {'class': 'chapter-title-rtl'})
 
         def unwrap_h5(h5) -> Optional[LelScanChapter]:
@@ -2,6 +2,7 @@ import re
 from typing import Optional
 
 from motorized import Q
+from pymongo import ASCENDING, IndexModel
 
 from toonbase import AsyncToon, SoupMixin, ToonManager
 
@@ -29,6 +30,9 @@ class MangaOriginToon(SoupMixin, AsyncToon):
         manager_class = MangaOriginmManager
         collection = 'toons'
         filters = Q(domain='mangas-origines.fr')
+        indexes = [
+            IndexModel([('domain', ASCENDING), ('next', ASCENDING)], name='domain_next'),
+        ]
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
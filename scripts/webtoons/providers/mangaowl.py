@@ -1,16 +1,17 @@
+import asyncio
 import re
 import os
 from typing import Optional, List, Literal
 from typing_extensions import Literal
 from motorized import mark_parents, Q
 from newtoon import Chapter, WebToonPacked, SeleniumMixin, ToonManager, LocalStorage, error_handler
+from listings import memoize_listing
 from selenium.common import exceptions
 from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
 
 from undetected_chromedriver import Chrome
-from time import sleep
 from aiohttp.client_exceptions import ClientResponseError
 
 
@@ -23,16 +24,18 @@ class MangaOwlChapter(Chapter):
         # s = self._parent.driver.execute_script('return encodeURIComponent(btoa(document.location.origin));')
         # user = 0
         # return f'https://r.mangaowls.com/reader/{self._parent.code}/{self.id}/{user}?tr={tr}&s={s}'
-        self.click()
-        url: str = self._parent.driver.current_url
-        return url
+        # the reader can only be reached by clicking on the chapter from the
+        # toon's page, see `click`
+        return self._parent.url
 
     async def get_page_content(self, retries=10):
         for _ in range(0, retries):
-            page = await self._parent.parse_cloudflare_url(self.url, delay=3)
-            if 'mangaowl' in self._parent.driver.current_url:
+            await self.click()
+            browser = self._parent.browser
+            page = await self._parent.parse_cloudflare_url(await browser.current_url(), delay=3)
+            if 'mangaowl' in await browser.current_url():
                 return page
-        raise Exception('cannot enforce self url' + self._parent.driver.current_url)
+        raise Exception('cannot enforce self url' + await self._parent.browser.current_url())
 
     async def get_pages_urls(self) -> List[str]:
         await self._parent.parse_url(self._parent.url)
@@ -46,33 +49,40 @@ class MangaOwlChapter(Chapter):
         name = getattr(self, self._parent.chapters_naming)
         return os.path.join(self._parent.path, f'{name}.cbz')
 
-    def click(self) -> None:
-        driver: Chrome = self._parent.driver
+    async def click(self) -> None:
+        browser = self._parent.browser
+        driver: Chrome = browser.driver
 
         # avoid the "adult content" warning
         storage = LocalStorage(driver)
-        storage.set('mgo_warning', 'true')
+        await browser.run(storage.set, 'mgo_warning', 'true')
 
         # go back to the chapters's list
-        driver.get(self._parent.url)
-        sleep(3)
+        await self._parent.navigate(self._parent.url)
 
         # getting the <ul id='simpleList'>
-        chapters_list: WebElement = driver.find_element_by_id('simpleList')
+        chapters_list: WebElement = await self._parent.wait_for_selector('ul#simpleList')
 
-        # move the cursor over the chapter's list.
-        ActionChains(driver).move_to_element(chapters_list).perform()
-        link = chapters_list.find_element(By.XPATH, f"//a[@chapter-id='{self.id}']")
+        def click_link() -> str:
+            # move the cursor over the chapter's list.
+            ActionChains(driver).move_to_element(chapters_list).perform()
+            link = chapters_list.find_element(By.XPATH, f"//a[@chapter-id='{self.id}']")
 
-        # prevent thoses morrons to open the link in a new tab...
-        driver.execute_script("arguments[0].target='_self';", link)
+            # prevent thoses morrons to open the link in a new tab...
+            driver.execute_script("arguments[0].target='_self';", link)
 
-        # actually click on the link
-        actions = ActionChains(driver)
-        actions.move_to_element(link).click().perform()
+            # actually click on the link
+            previous_url = driver.current_url
+            actions = ActionChains(driver)
+            actions.move_to_element(link).click().perform()
+            return previous_url
 
-        # let the time to update the page.
-        sleep(1)
+        # wait for the reader to replace the page
+        previous_url = await browser.run(click_link)
+        try:
+            await self._parent.wait_until(lambda: driver.current_url != previous_url)
+        except asyncio.TimeoutError:
+            pass
 
 
 class MangaOwl(SeleniumMixin, WebToonPacked):
@@ -107,6 +117,7 @@ class MangaOwl(SeleniumMixin, WebToonPacked):
         instance.chapters = await instance.get_chapters_from_website()
         return instance
 
+    @memoize_listing
     async def get_chapters_from_website(self) -> List[MangaOwlChapter]:
         # print(self.url)
         page = await self.parse_cloudflare_url(self.url)
@@ -2,6 +2,7 @@ import re
 from typing import Optional, List
 from motorized import Q
 from newtoon import Chapter, WebToonPacked, ToonManager
+from listings import memoize_listing
 
 
 class MangaScanChapter(Chapter):
@@ -41,8 +42,9 @@ class MangaScan(WebToonPacked):
     def url(self) -> str:
         return f'http://{self.domain}/manga/{self.name}'
 
+    @memoize_listing
     async def get_chapters_from_website(self) -> List[MangaScanChapter]:
-        page = await self.parse_url(self.url)
+        page = await self.parse_listing(self.url)
         chapters_ul = page.find('ul', class_='chapters')
         chapters_lis = chapters_ul.find_all('li')
         links = [li.find('a')['href'] for li in chapters_lis]
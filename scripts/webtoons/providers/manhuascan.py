@@ -1,5 +1,6 @@
 from typing import List, Optional
 from newtoon import Chapter, WebToonPacked,  SeleniumMixin
+from listings import memoize_listing
 
 # INFO POUR MOI, tu peux supprimer ca, le site est relou
 # et a une protection cloudflare qui te renvois de la 404 meme si la page
@@ -18,6 +19,7 @@ class ManHuaScan(SeleniumMixin, WebToonPacked):
     domain: str = 'manhuascan.me'
     chapters: List[ManHuaScanChapter] = []
     corporate: bool = True
+    _browser_handoff = True
 
     @property
     def base_url(self) -> str:
@@ -27,6 +29,7 @@ class ManHuaScan(SeleniumMixin, WebToonPacked):
     def url(self) -> str:
         return f'{self.base_url}.html'
 
+    @memoize_listing
     async def get_chapters_from_website(self) -> List[ManHuaScanChapter]:
         page = await self.parse_cloudflare_url(self.url)
         chapters_div = page.find('div', {'id': 'list-chapters'})
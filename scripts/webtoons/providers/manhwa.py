@@ -1,5 +1,6 @@
 from typing import List, Optional
 from newtoon import Chapter, WebToonPacked,  ToonManager
+from listings import memoize_listing
 from motorized import Q
 import re
 
@@ -40,9 +41,10 @@ class Manhwa(WebToonPacked):
     def url(self) -> str:
         return f'https://www.69manhwa.com/manga/{self.name}/'
 
+    @memoize_listing
     async def get_chapters_from_website(self) -> List[ManhwaChapter]:
         chapters_url = f'https://www.69manhwa.com/manga/{self.name}/ajax/chapters/'
-        page = await self.parse_url(chapters_url, 'post')
+        page = await self.parse_listing(chapters_url, 'post')
         links = page.find_all('a')
         chapters_urls = list([link['href'] for link in links])
         if self.reversed:
@@ -1,10 +1,10 @@
 from typing import List, Optional
 import bs4 as BeautifulSoup
-import asyncio
 from toonbase import AsyncToon, SoupMixin, provide_soup
+from scheduler import leech_run, run_interruptible
 from motorized import Q
 import sys
-from glob import glob
+from dirindex import dir_index
 
 
 class NHentaiToon(SoupMixin, AsyncToon):
@@ -13,6 +13,7 @@ class NHentaiToon(SoupMixin, AsyncToon):
     domain: str = 'nhentai.xxx'
     page_content: Optional[str] = None
     _cdn = 'https://cdn.nhentai.xxx'
+    _rate_limit = 5
     lang: str = 'en'
 
     class Mongo:
@@ -60,7 +61,7 @@ class NHentaiToon(SoupMixin, AsyncToon):
         await super().pull(*args, **kwargs)
 
     def exists(self):
-        return bool(glob(f'{self.path}/?{self.episode:6}]*.cbz'))
+        return dir_index.match(self.path, f'?{self.episode:6}]*.cbz')
 
 
 
@@ -78,9 +79,9 @@ async def get_scan(sauce_code: int, name: str = None) -> bool:
 
 
 async def get_scan_list(sauce_list: List[int]) -> None:
-    for sauce in sauce_list:
-        if await get_scan(sauce):
-            await asyncio.sleep(0.2)
+    async with leech_run():
+        for sauce in sauce_list:
+            await get_scan(sauce)
 
 
 if __name__ == "__main__":
@@ -89,4 +90,4 @@ if __name__ == "__main__":
     except (IndexError, ValueError):
         print(f'usage: ./{sys.argv[0]} [sauce_code]')
         sys.exit(1)
-    asyncio.run(get_scan_list(sauce_list))
+    run_interruptible(get_scan_list(sauce_list))
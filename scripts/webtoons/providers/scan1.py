@@ -2,6 +2,7 @@ import re
 from typing import List, Optional
 from motorized import mark_parents, Q
 from newtoon import Chapter, WebToonPacked, ToonManager
+from listings import memoize_listing
 import ssl
 
 
@@ -27,8 +28,8 @@ class ScanOneChapter(Chapter):
             return []
 
     async def nexts(self) -> List["ScanOneChapter"]:
-        instance = await self._parent.from_url(self._parent.url)
-        return list(filter(lambda chapter: chapter > self, instance.chapters))
+        chapters = await self._parent.get_chapters_from_website()
+        return list(filter(lambda chapter: chapter > self, chapters))
 
 
 class ScanOne(WebToonPacked):
@@ -52,23 +53,27 @@ class ScanOne(WebToonPacked):
         if not match:
             return None
         instance = cls(name=match.groups()[0])
-        page = await instance.parse_url(url)
+        instance.chapters = await instance.get_chapters_from_website()
+        mark_parents(instance)
+        return instance
+
+    @memoize_listing
+    async def get_chapters_from_website(self) -> List[ScanOneChapter]:
+        page = await self.parse_listing(self.url)
         chapters_lis = page.find('ul', class_='chapters').find_all('li')
 
         def unpack_li(index: int, li) -> ScanOneChapter:
             link = li.find('a')
             return ScanOneChapter(
-                name=link.text.replace(instance.name, '').strip(),
+                name=link.text.replace(self.name, '').strip(),
                 episode=index,
                 key_name=link['href'].split('/')[-1]
             )
 
-        instance.chapters = list([
+        return list([
             unpack_li(index, li)
             for index, li in enumerate(chapters_lis[::-1], start=1)
         ])
-        mark_parents(instance)
-        return instance
 
     @classmethod
     async def from_name(cls, name: str) -> Optional["ScanOne"]:
@@ -1,4 +1,5 @@
 from newtoon import Chapter, WebToonPacked, SeleniumMixin
+from listings import memoize_listing
 from motorized import Q
 from typing import Optional, List
 import re
@@ -47,8 +48,9 @@ class Tbate(SeleniumMixin, WebToonPacked):
     def url(self) -> str:
         return f'https://www.thebeginningaftertheend.fr/manga/{self.name}/'
 
+    @memoize_listing
     async def get_chapters_from_website(self) -> List[TbateChapter]:
-        page = await self.parse_url(self.url, delay=2)
+        page = await self.parse_listing(self.url)
         chapters_ul = page.find('ul', class_='version-chap')
         if chapters_ul is None:
             print('Warning: tbate can\'t get chapters')
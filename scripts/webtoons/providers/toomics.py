@@ -6,6 +6,7 @@ import re
 from selenium import webdriver
 from selenium.common.exceptions import UnexpectedAlertPresentException
 from motorized import Q
+from browsers import AsyncDriver, async_driver
 from toonbase import AsyncToon, ToonManager
 from newtoon import SeleniumMixin
 
@@ -40,8 +41,11 @@ class ToomicManager(SeleniumMixin, ToonManager):
             await toon.leech()
 
     async def authenticate(self, username: str, password: str) -> None:
+        await self.browser.get(f'https://{self.domain}/{self.lang}')
+        await self.browser.run(self.fill_login_form, username, password)
+
+    def fill_login_form(self, username: str, password: str) -> None:
         driver = self.driver
-        driver.get(f'https://{self.domain}/{self.lang}')
         try:
             driver.find_element_by_id('toggle-login').click()
         except Exception:
@@ -99,30 +103,33 @@ class Toomic(AsyncToon):
         return f'https://toomics.com/{self.lang}/webtoon/detail/code/' \
                f'{self.code}/ep/{self.episode}/toon/{self.identifier}'
 
-    def parse(self):
-        self.get_html()
+    @property
+    def browser(self) -> AsyncDriver:
+        return async_driver(self._driver)
+
+    async def parse(self):
+        await self.get_html()
         container = self._soup.find('div', {'id': 'viewer-img'})
         if not container:
             return []
         return container.find_all('img')
 
     async def get_pages(self):
-        return list([img.get('src') for img in self.parse()])
+        return list([img.get('src') for img in await self.parse()])
 
-    def get_html(self):
+    async def get_html(self):
         if self._html:
             return self
-        self.go()
-        self._html = self._driver.page_source
+        await self.go()
+        self._html = await self.browser.page_source()
         self._soup = BeautifulSoup.BeautifulSoup(self._html, 'lxml')
         return self
 
-    def go(self):
+    async def go(self):
         """Open the current chapter on the selenium navigator
         """
-        driver = self._driver
-        if driver.current_url != self.url:
-            driver.get(self.url)
+        if await self.browser.current_url() != self.url:
+            await self.browser.get(self.url)
 
     def get_pagination(self):
         footer_links = self._driver \
@@ -132,9 +139,10 @@ class Toomic(AsyncToon):
         return (previous, current, next_chapter)
 
     async def get_next(self) -> Optional["Toomic"]:
-        self.go()
-        next_chapter = self.get_pagination()[2]
-        next_chapter_url = next_chapter.get_property('href')
+        await self.go()
+        next_chapter_url = await self.browser.run(
+            lambda: self.get_pagination()[2].get_property('href')
+        )
         instance = self.objects.from_url(next_chapter_url, name=self.name)
         if not instance:
             return None
@@ -1,11 +1,13 @@
 
 #!./venv/bin/python
 import re
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 from motorized import Q, mark_parents
 
-from newtoon import Chapter, WebToonPacked, ToonManager, retry
+from asyncio_pool import AioPool
+from newtoon import Chapter, WebToonPacked, ToonManager, retry, raise_on_any_error_from_pool
+from listings import memoize_listing
 from bs4 import BeautifulSoup, ResultSet, element
 from urllib.parse import unquote
 
@@ -74,7 +76,8 @@ class WebToonChapter(Chapter):
         return self._page
 
     async def nexts(self) -> List["WebToonChapter"]:
-        return list(filter(lambda chapter: chapter > self, await self.others()))
+        chapters = await self._parent.discover_new_chapters()
+        return list(filter(lambda chapter: chapter > self, chapters))
 
 
 class WebToon(WebToonPacked):
@@ -109,10 +112,18 @@ class WebToon(WebToonPacked):
         }
 
     @retry(3, AttributeError, delay=3)
-    async def get_chapters_from_website(self, page_number: int = 1):
+    async def get_listing_page(self, page_number: int) -> Tuple[List[WebToonChapter], int]:
+        """return the chapters of the listing page `page_number` (oldest first)
+        and the highest page number its pagination links to.
+        """
         url = self.url + f'&page={page_number}'
         print(f'Scanning for page {page_number} on {self.name}')
-        page = await self.parse_url(url)
+        # the first page holds the newest chapters, if it did not change
+        # since the last sweep there is nothing new.
+        if page_number == 1:
+            page = await self.parse_listing(url)
+        else:
+            page = await self.parse_url(url)
         chapters_lis = page.find('ul', id='_listUl').find_all('li')
 
         def get_chapter_instance_from_li(li: ResultSet) -> Optional[WebToonChapter]:
@@ -121,23 +132,69 @@ class WebToon(WebToonPacked):
             return WebToonChapter.from_url(url, episode_pretty_name)
 
         chapters = list([get_chapter_instance_from_li(li) for li in chapters_lis])
-        chapters = chapters[::-1]
 
-        # now we need to find the next page
+        # the pagination shows a group of pages and an arrow to the next group
         pagination = page.find('div', class_='paginate').find_all('a')
-        index_of_current = None
-        for index, item in enumerate(pagination):
-            if item['href'] == '#':
-                index_of_current = index
+        pages_numbers = [page_number]
+        for link in pagination:
+            match = re.search(r'[?&]page=(\d+)', link['href'])
+            if match:
+                pages_numbers.append(int(match.groups()[0]))
+        return chapters[::-1], max(pages_numbers)
+
+    @memoize_listing
+    async def get_chapters_from_website(self, pool_size: int = 4, since: Optional[int] = None) -> List[WebToonChapter]:
+        """Fetch the first listing page, then all the pages its pagination
+        shows at once (by groups, the pagination only shows a few pages).
+
+        With `since` (an episode number) only the chapters after it are
+        returned: the listing is newest first so the pages are walked one by
+        one until that episode shows up, which usually means one request.
+        """
+        if since is not None:
+            return await self.get_chapters_since(since)
+        pages = {}
+        pages[1], last_page = await self.get_listing_page(1)
+        pool = AioPool(pool_size)
+        while last_page > max(pages):
+            missing = list(range(max(pages) + 1, last_page + 1))
+            result = await pool.map(self.get_listing_page, missing)
+            raise_on_any_error_from_pool(result)
+            for page_number, (chapters, page_last_page) in zip(missing, result):
+                pages[page_number] = chapters
+                last_page = max(last_page, page_last_page)
+
+        # the last pages hold the oldest chapters
+        return list([
+            chapter
+            for page_number in sorted(pages, reverse=True)
+            for chapter in pages[page_number]
+        ])
+
+    async def get_chapters_since(self, episode: int) -> List[WebToonChapter]:
+        pages = []
+        page_number, last_page = 0, 1
+        while page_number < last_page:
+            page_number += 1
+            chapters, last_page = await self.get_listing_page(page_number)
+            pages.insert(0, chapters)
+            if any(chapter.episode <= episode for chapter in filter(None, chapters)):
                 break
-
-        # checking for the stop condition
-        next_lefts = len(pagination[index_of_current:])
-        if next_lefts == 1:
-            return chapters
-
-        next_page_chapters = await self.get_chapters_from_website(page_number + 1)
-        return next_page_chapters + chapters
+        return list([
+            chapter
+            for chapters in pages
+            for chapter in chapters
+            if chapter and chapter.episode > episode
+        ])
+
+    async def discover_new_chapters(self) -> List[WebToonChapter]:
+        """return the chapters published after the highest known episode
+        """
+        # the stored chapters are trusted, some may lack their episode
+        episodes = list([chapter.episode for chapter in self.chapters if chapter.episode is not None])
+        if not episodes:
+            return await self.get_chapters_from_website()
+        return await self.get_chapters_from_website(since=max(episodes))
 
     @classmethod
     async def from_url(cls, url: str) -> Optional["WebToon"]:
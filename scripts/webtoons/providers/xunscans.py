@@ -1,8 +1,8 @@
 from motorized import Q, mark_parents
 from newtoon import Chapter, WebToonPacked, Chapter, ToonManager, SeleniumMixin
+from listings import memoize_listing
 from typing import List, Optional
 
-import asyncio
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.webelement import WebElement
@@ -28,14 +28,14 @@ class XunScanChapter(Chapter):
         return f'{self._parent.url}/{self.key}/'
 
     async def get_pages_urls(self) -> List[str]:
-        self._parent.driver.get(self.url)
-        self._parent.driver.implicitly_wait(5)
+        await self._parent.navigate(self.url, ready=False)
+        reading_div: WebElement = await self._parent.wait_for_selector('div.reading-content')
 
-        reading_div: WebElement = self._parent.driver.find_element(By.XPATH, '//div[@class="reading-content"]')
-        imgs: List[WebElement] = reading_div.find_elements(By.XPATH, '//div[@class="page-break "]/img')
-        srcs: List[str] = list([elem.get_attribute('data-src').strip() for elem in imgs])
-        srcs = list(filter(None, srcs))
-        return srcs
+        def read_srcs() -> List[str]:
+            imgs: List[WebElement] = reading_div.find_elements(By.XPATH, '//div[@class="page-break "]/img')
+            srcs: List[str] = list([elem.get_attribute('data-src').strip() for elem in imgs])
+            return list(filter(None, srcs))
+        return await self._parent.browser.run(read_srcs)
 
     @classmethod
     def from_element(cls, element: WebElement, index: int) -> Optional["XunScanChapter"]:
@@ -73,31 +73,44 @@ class XunScan(SeleniumMixin, WebToonPacked):
     def url(self) -> str:
         return f'https://xunscans.xyz/manga/{self.name}'
 
+    @memoize_listing
     async def get_chapters_from_website(self) -> List[XunScanChapter]:
-        self.driver.get(self.url)
-        await asyncio.sleep(3)
+        await self.navigate(self.url, ready=False)
+
+        # the chapters list is loaded by a script once the page is there
+        await self.wait_for_selector('#manga-chapters-holder li a', timeout=15)
+
+        def chapters_count() -> int:
+            return len(self.driver.find_elements(By.CSS_SELECTOR, '#manga-chapters-holder li a'))
+
+        def expanded() -> bool:
+            # the button hides itself once the whole list is shown
+            buttons = self.driver.find_elements(By.CSS_SELECTOR, 'span.chapter-readmore')
+            return chapters_count() > count or not any(button.is_displayed() for button in buttons)
 
         # click on the "read more" button to get all the chapters list
         # read_more = self.driver.find_element(By.XPATH, '//*[@id="manga-chapters-holder"]/div[2]/div/div/span')
-        read_more = self.driver.find_element(By.CSS_SELECTOR, 'span.chapter-readmore')
+        read_more = await self.wait_for_selector('span.chapter-readmore')
+        count = await self.browser.run(chapters_count)
         try:
-            read_more.click()
-            # print('waiting for chapters to load...')
-            await asyncio.sleep(10)
+            await self.browser.run(read_more.click)
         except ElementNotInteractableException:
             print('cannot expand chapters')
+        else:
+            await self.wait_until(expanded, timeout=15)
+
+        def read_chapters() -> List[XunScanChapter]:
+            links = self.driver.find_element(By.ID, 'manga-chapters-holder').find_elements(By.XPATH, '//div/div/ul/li/a')
 
-        links = self.driver.find_element(By.ID, 'manga-chapters-holder').find_elements(By.XPATH, '//div/div/ul/li/a')
-
-        if self.reversed:
-            links = links[::-1]
-        chapters = list(
-            filter(
-                None,
-                [
-                    XunScanChapter.from_element(elem, index)
-                    for index, elem in enumerate(links)
-                ]
+            if self.reversed:
+                links = links[::-1]
+            return list(
+                filter(
+                    None,
+                    [
+                        XunScanChapter.from_element(elem, index)
+                        for index, elem in enumerate(links)
+                    ]
+                )
             )
-        )
-        return chapters
+        return await self.browser.run(read_chapters)
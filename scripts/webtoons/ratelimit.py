@@ -0,0 +1,75 @@
+import asyncio
+from time import monotonic
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+
+class TokenBucket:
+    """Allow `rate` requests per second on average with bursts of up to
+    `burst` requests, callers are served in arrival order.
+    """
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens: float = burst
+        self.updated = monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        # the limiter outlives the event loops (one per asyncio.run)
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        return self._lock
+
+    def _refill(self) -> None:
+        now = monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        async with self._get_lock():
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+def request_host(url: Optional[str], domain: str) -> str:
+    """The bucket of a request: the toon's `domain` for its own pages (with or
+    without www.), the host itself for anything else (the images cdn...).
+    """
+    host = urlparse(url).hostname if url else None
+    if not host or host in (domain, f'www.{domain}'):
+        return domain
+    return host
+
+
+class RateLimiter:
+    """Process-wide registry of token buckets, one per domain or host.
+    The first toon declaring a rate for a domain configures its bucket,
+    domains without any declared rate are not limited.
+    """
+    def __init__(self):
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def configure(self, domain: str, rate: float, burst: int = 1) -> TokenBucket:
+        self._buckets[domain] = TokenBucket(rate, burst)
+        return self._buckets[domain]
+
+    def get(self, domain: str) -> Optional[TokenBucket]:
+        return self._buckets.get(domain)
+
+    async def acquire(self, domain: str, rate: Optional[float] = None, burst: int = 1) -> None:
+        bucket = self._buckets.get(domain)
+        if bucket is None:
+            if not rate:
+                return
+            bucket = self.configure(domain, rate, burst)
+        await bucket.acquire()
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,31 @@
+from typing import Self
+
+
+class RunScoped:
+    """Process-wide resource only active inside `async with` blocks (all of
+    them are entered by `scheduler.leech_run`), it can be entered several
+    times: `open` is called when the first block enters and `close` when the
+    last one exits.
+    """
+    _users: int = 0
+
+    @property
+    def active(self) -> bool:
+        return self._users > 0
+
+    async def open(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def __aenter__(self) -> Self:
+        if not self._users:
+            await self.open()
+        self._users += 1
+        return self
+
+    async def __aexit__(self, *_) -> None:
+        self._users -= 1
+        if not self._users:
+            await self.close()
@@ -0,0 +1,104 @@
+import asyncio
+import signal
+import sys
+from contextlib import asynccontextmanager
+from typing import (Any, AsyncIterable, Awaitable, Callable, Coroutine, Dict,
+                    Iterable, List, Optional)
+
+from browsers import browser_pool
+from dirindex import dir_index
+from listings import listings
+from sessions import sessions
+from workers import cpu_pool
+
+
+@asynccontextmanager
+async def leech_run():
+    """Keep the process-wide resources shared by the toons (http sessions,
+    cpu workers, listings cache, browsers, folders index...) open for the duration of a run
+    and release them at the end.
+    """
+    async with sessions, cpu_pool, listings, browser_pool, dir_index:
+        yield
+
+
+def run_interruptible(main: Coroutine) -> Any:
+    """`asyncio.run` with a clean exit on ctrl+c: the first SIGINT cancels
+    the run so the `finally` blocks (pages journals, bulk writes, browsers...)
+    still flush, then the process exits with the usual 130.
+    """
+    async def runner() -> Any:
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGINT, asyncio.current_task().cancel)
+        try:
+            return await main
+        finally:
+            loop.remove_signal_handler(signal.SIGINT)
+
+    try:
+        return asyncio.run(runner())
+    except (asyncio.CancelledError, KeyboardInterrupt):
+        print('\nInterrupted, the pages already fetched are kept for the next run')
+        sys.exit(130)
+
+
+class LeechScheduler:
+    """Run many toons at once with a global worker limit and a separate
+    limit per key (the toon's `domain` by default).
+
+    Each job waits for its own keys before taking a global slot, so a busy
+    domain never holds workers that another domain could use.
+    """
+    def __init__(
+        self,
+        workers: int = 8,
+        per_domain: int = 2,
+        limits: Optional[Dict[str, int]] = None
+    ):
+        self.workers = workers
+        self.per_domain = per_domain
+        self.limits: Dict[str, int] = dict(limits or {})
+        self._global: Optional[asyncio.Semaphore] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def semaphore(self, key: str) -> asyncio.Semaphore:
+        if key not in self._semaphores:
+            self._semaphores[key] = asyncio.Semaphore(self.limits.get(key, self.per_domain))
+        return self._semaphores[key]
+
+    @staticmethod
+    def keys(item: Any) -> List[str]:
+        return [getattr(item, 'domain', None) or '']
+
+    async def _run_one(self, item: Any, job: Callable[[Any], Awaitable], keys: List[str]) -> Optional[Exception]:
+        # always acquire the semaphores in the same order to avoid deadlocks
+        # between jobs sharing more than one key.
+        semaphores = [self.semaphore(key) for key in sorted(set(keys))]
+        for semaphore in semaphores:
+            await semaphore.acquire()
+        try:
+            async with self._global:
+                await job(item)
+        except Exception as error:
+            return error
+        finally:
+            for semaphore in reversed(semaphores):
+                semaphore.release()
+        return None
+
+    async def run(
+        self,
+        items: AsyncIterable[Any],
+        job: Callable[[Any], Awaitable],
+        keys: Optional[Callable[[Any], Iterable[str]]] = None
+    ) -> List[Exception]:
+        """Call `job` on every item of `items` and return the raised errors
+        in the order of `items`.
+        """
+        keys = keys or self.keys
+        self._global = asyncio.Semaphore(self.workers)
+        tasks = []
+        async for item in items:
+            tasks.append(asyncio.create_task(self._run_one(item, job, list(keys(item)))))
+        results = await asyncio.gather(*tasks)
+        return list(filter(None, results))
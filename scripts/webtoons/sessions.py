@@ -0,0 +1,188 @@
+import asyncio
+from time import time
+from typing import Any, Awaitable, Callable, Dict, Mapping, NamedTuple, Optional, Tuple
+
+import aiohttp
+
+from backoff import RETRY_STATUSES, Backoff, retry_after, retry_budget
+from runscope import RunScoped
+
+
+class FetchResult(NamedTuple):
+    status: int
+    headers: Mapping[str, str]
+    body: bytes
+
+
+class Clearance(NamedTuple):
+    """Cookies and user agent of a browser that went through the challenge
+    (cloudflare & co) of a domain, `expires` is a unix timestamp.
+    """
+    cookies: Dict[str, str]
+    user_agent: str
+    expires: Optional[float] = None
+
+    @property
+    def expired(self) -> bool:
+        return self.expires is not None and time() >= self.expires
+
+
+class ThrottledRequest:
+    """Wait for the rate limiter before sending the request, can be awaited
+    or used as an async context manager like the aiohttp requests.
+    """
+    def __init__(self, throttle: Optional[Callable[[str], Awaitable[None]]], send: Callable, url: str):
+        self._throttle = throttle
+        self._send = send
+        self._url = url
+        self._response: Optional[aiohttp.ClientResponse] = None
+
+    async def _request(self) -> aiohttp.ClientResponse:
+        if self._throttle:
+            await self._throttle(self._url)
+        return await self._send()
+
+    def __await__(self):
+        return self._request().__await__()
+
+    async def __aenter__(self) -> aiohttp.ClientResponse:
+        self._response = await self._request()
+        return self._response
+
+    async def __aexit__(self, *_) -> None:
+        self._response.release()
+
+
+class ToonSession:
+    """Thin view over a `aiohttp.ClientSession` that sends the headers of one
+    toon with each request (the session may be shared between all the toons
+    of a domain) and goes through the toon's rate limit.
+    """
+    backoff = Backoff()
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        headers: Optional[Dict[str, str]] = None,
+        throttle: Optional[Callable[[str], Awaitable[None]]] = None,
+        domain: str = ''
+    ):
+        self.session = session
+        self.headers = headers or {}
+        self.throttle = throttle
+        self.domain = domain
+
+    def request(self, method: str, url: str, **kwargs) -> ThrottledRequest:
+        kwargs['headers'] = {**self.headers, **(kwargs.get('headers') or {})}
+        return ThrottledRequest(self.throttle, lambda: self.session.request(method, url, **kwargs), url)
+
+    def get(self, url: str, **kwargs) -> ThrottledRequest:
+        return self.request('get', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> ThrottledRequest:
+        return self.request('post', url, **kwargs)
+
+    async def fetch(self, url: str, method: str = 'get', retries: int = 3, **kwargs) -> bytes:
+        """Return the body of `url`, transient failures (connection errors,
+        timeouts, 429 and 5xx statuses) are retried with an exponential
+        backoff, honoring `Retry-After`, within the domain's retry budget.
+
+        raises:
+        - aiohttp.ClientResponseError when the server answers with an error
+        - aiohttp.ClientError when the retries are exhausted
+        """
+        return (await self.fetch_response(url, method, retries, **kwargs)).body
+
+    async def fetch_response(self, url: str, method: str = 'get', retries: int = 3, **kwargs) -> FetchResult:
+        """Same as `fetch` but also return the status and headers of the
+        response, for conditional requests (304) for instance.
+        """
+        retry_budget.deposit(self.domain)
+        attempt = 0
+        while True:
+            delay: Optional[float] = None
+            try:
+                async with self.request(method, url, **kwargs) as response:
+                    if response.status not in RETRY_STATUSES or attempt >= retries:
+                        response.raise_for_status()
+                        return FetchResult(response.status, response.headers, await response.read())
+                    delay = retry_after(response.headers)
+                    if not retry_budget.withdraw(self.domain):
+                        response.raise_for_status()
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError):
+                if attempt >= retries or not retry_budget.withdraw(self.domain):
+                    raise
+            await asyncio.sleep(self.backoff.delay(attempt) if delay is None else delay)
+            attempt += 1
+
+    @property
+    def cookie_jar(self) -> aiohttp.CookieJar:
+        return self.session.cookie_jar
+
+
+class SessionPool(RunScoped):
+    """Process-wide registry of long-lived `aiohttp.ClientSession`, one per
+    domain (and per set of initial cookies, since some providers send
+    different cookies depending on the toon's language).
+
+    Every session is closed when the last `async with sessions:` block exits.
+    """
+    def __init__(self, keepalive_timeout: float = 60, dns_cache_ttl: int = 300):
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_cache_ttl = dns_cache_ttl
+        self._sessions: Dict[Tuple, aiohttp.ClientSession] = {}
+        self._clearances: Dict[str, Clearance] = {}
+
+    def get(
+        self,
+        domain: str,
+        cookies: Optional[Dict[str, Any]] = None,
+        quote_cookie: bool = True
+    ) -> aiohttp.ClientSession:
+        key = (domain, quote_cookie, tuple(sorted((cookies or {}).items())))
+        session = self._sessions.get(key)
+        if session is None or session.closed:
+            jar = aiohttp.CookieJar(unsafe=True, quote_cookie=quote_cookie)
+            if cookies:
+                jar.update_cookies(cookies)
+            connector = aiohttp.TCPConnector(
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+            )
+            session = aiohttp.ClientSession(connector=connector, cookie_jar=jar)
+            self._sessions[key] = session
+        return session
+
+    def clearance(self, domain: str) -> Optional[Clearance]:
+        """Return the still valid clearance handed over for `domain` if any.
+        """
+        clearance = self._clearances.get(domain)
+        if clearance and clearance.expired:
+            self.revoke_clearance(domain)
+            return None
+        return clearance
+
+    def set_clearance(self, domain: str, clearance: Clearance) -> None:
+        self._clearances[domain] = clearance
+
+    def revoke_clearance(self, domain: str) -> None:
+        self._clearances.pop(domain, None)
+
+    def client(
+        self,
+        domain: str,
+        headers: Dict[str, str],
+        cookies: Optional[Dict[str, Any]] = None,
+        quote_cookie: bool = True,
+        throttle: Optional[Callable[[str], Awaitable[None]]] = None
+    ) -> ToonSession:
+        return ToonSession(self.get(domain, cookies, quote_cookie), headers, throttle, domain)
+
+    async def close(self) -> None:
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        for session in sessions:
+            await session.close()
+
+
+sessions = SessionPool()
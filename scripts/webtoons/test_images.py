@@ -0,0 +1,49 @@
+"""Checks of the page validation, run them with `python -m pytest test_images.py`
+"""
+import struct
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from images import TruncatedImageError, check_image
+
+
+def jpeg() -> bytes:
+    output = BytesIO()
+    Image.new('RGB', (32, 32), 'red').save(output, 'JPEG')
+    return output.getvalue()
+
+
+def box(box_type: bytes, payload: bytes) -> bytes:
+    return struct.pack('>I', 8 + len(payload)) + box_type + payload
+
+
+def avif() -> bytes:
+    return box(b'ftyp', b'avif\x00\x00\x00\x00') + box(b'meta', b'\x00' * 4) + box(b'mdat', b'data')
+
+
+def test_jpeg_complete():
+    assert check_image(jpeg(), strict=True)
+
+
+def test_jpeg_trailing_bytes():
+    assert check_image(jpeg() + b'trailingjunk', strict=True)
+
+
+def test_jpeg_truncated():
+    with pytest.raises(TruncatedImageError):
+        check_image(jpeg()[:-10])
+
+
+def test_avif_complete():
+    assert check_image(avif())
+
+
+def test_avif_trailing_bytes():
+    assert check_image(avif() + b'\x00\x00\x00padding')
+
+
+def test_avif_truncated():
+    with pytest.raises(TruncatedImageError):
+        check_image(avif()[:-2])
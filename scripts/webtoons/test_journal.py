@@ -0,0 +1,46 @@
+"""Resume of the interrupted chapters, run them with `python -m pytest test_journal.py`
+"""
+import os
+
+from journal import PageJournal
+
+
+def test_resume(tmp_path):
+    with PageJournal('/library/toon/1.cbz', root=str(tmp_path)) as journal:
+        journal.record('000.jpg', 'https://cdn/0.jpg', b'page 0')
+        journal.record('001.jpg', 'https://cdn/1.jpg', b'page 1')
+
+    with PageJournal('/library/toon/1.cbz', root=str(tmp_path)) as journal:
+        assert len(journal) == 2
+        assert journal.get('000.jpg', 'https://cdn/0.jpg') == b'page 0'
+        assert journal.get('001.jpg', 'https://cdn/1.jpg') == b'page 1'
+        assert journal.get('002.jpg', 'https://cdn/2.jpg') is None
+
+
+def test_changed_url_or_content(tmp_path):
+    with PageJournal('/library/toon/1.cbz', root=str(tmp_path)) as journal:
+        journal.record('000.jpg', 'https://cdn/0.jpg', b'page 0')
+        journal.record('001.jpg', 'https://cdn/1.jpg', b'page 1')
+        with open(os.path.join(journal.path, '001.jpg'), 'wb') as fp:
+            fp.write(b'page 1, half')
+        assert journal.get('000.jpg', 'https://cdn/other.jpg') is None
+        assert journal.get('001.jpg', 'https://cdn/1.jpg') is None
+
+
+def test_cut_index_line(tmp_path):
+    with PageJournal('/library/toon/1.cbz', root=str(tmp_path)) as journal:
+        journal.record('000.jpg', 'https://cdn/0.jpg', b'page 0')
+    with open(journal.index_path, 'a') as fp:
+        fp.write('{"url": "https://cdn/1.jpg", "filen')
+
+    with PageJournal('/library/toon/1.cbz', root=str(tmp_path)) as journal:
+        assert len(journal) == 1
+        assert journal.get('000.jpg', 'https://cdn/0.jpg') == b'page 0'
+
+
+def test_discard(tmp_path):
+    with PageJournal('/library/toon/1.cbz', root=str(tmp_path)) as journal:
+        journal.record('000.jpg', 'https://cdn/0.jpg', b'page 0')
+        journal.discard()
+    assert not os.path.exists(journal.path)
+    assert PageJournal('/library/toon/2.cbz', root=str(tmp_path)).path != journal.path
@@ -0,0 +1,39 @@
+"""Concurrent chapter updates, run them with `python -m pytest test_newtoon.py`
+"""
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+from motorized import connection
+
+from newtoon import ChaptersConflict
+from providers.webtoons import WebToon, WebToonChapter
+
+
+def chapter(episode: int) -> WebToonChapter:
+    return WebToonChapter(name=f'Episode {episode}', episode=episode)
+
+
+async def stored_chapters(toon: WebToon) -> list:
+    raw_data = await WebToon.objects.collection.find_one({'_id': toon.id})
+    return list([chapter['episode'] for chapter in raw_data['chapters']])
+
+
+def test_push_chapters_conflict():
+    async def scenario():
+        connection.database = AsyncMongoMockClient()['webtoons']
+        toon = WebToon(name='toon', lang='en', titleno=1, gender='drama', chapters=[chapter(1), chapter(2)])
+        await toon.save()
+        stale = await WebToon.objects.get(name='toon')
+
+        toon.chapters.append(chapter(3))
+        await toon.push_chapters([toon.chapters[-1]])
+        assert await stored_chapters(toon) == [1, 2, 3]
+
+        # loaded before the push: its chapters are not the stored ones anymore
+        stale.chapters.append(chapter(3))
+        with pytest.raises(ChaptersConflict):
+            await stale.push_chapters([stale.chapters[-1]])
+        assert await stored_chapters(toon) == [1, 2, 3]
+
+    asyncio.run(scenario())
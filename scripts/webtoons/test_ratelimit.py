@@ -0,0 +1,46 @@
+"""Request throttling, run them with `python -m pytest test_ratelimit.py`
+"""
+import asyncio
+from time import monotonic
+
+from ratelimit import RateLimiter, TokenBucket, request_host
+
+
+def timed(coroutine) -> float:
+    start = monotonic()
+    asyncio.run(coroutine)
+    return monotonic() - start
+
+
+def test_burst_then_rate():
+    bucket = TokenBucket(rate=20, burst=3)
+
+    async def burst():
+        for _ in range(3):
+            await bucket.acquire()
+
+    async def more():
+        for _ in range(4):
+            await bucket.acquire()
+
+    assert timed(burst()) < 0.04
+    # the bucket is empty: 4 more requests at 20 per second
+    assert 0.18 <= timed(more()) < 0.4
+
+
+def test_unconfigured_domains_are_not_limited():
+    limiter = RateLimiter()
+
+    async def requests():
+        for _ in range(50):
+            await limiter.acquire('example.com')
+
+    assert timed(requests()) < 0.04
+    assert limiter.get('example.com') is None
+
+
+def test_request_host():
+    assert request_host(None, 'nhentai.xxx') == 'nhentai.xxx'
+    assert request_host('https://nhentai.xxx/g/1/', 'nhentai.xxx') == 'nhentai.xxx'
+    assert request_host('https://www.nhentai.xxx/g/1/', 'nhentai.xxx') == 'nhentai.xxx'
+    assert request_host('https://cdn.nhentai.xxx/1.jpg', 'nhentai.xxx') == 'cdn.nhentai.xxx'
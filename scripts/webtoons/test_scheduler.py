@@ -0,0 +1,50 @@
+"""Concurrency limits of the leech, run them with `python -m pytest test_scheduler.py`
+"""
+import asyncio
+from collections import Counter
+from types import SimpleNamespace
+
+from scheduler import LeechScheduler
+
+
+async def iterate(items):
+    for item in items:
+        yield item
+
+
+def test_limits():
+    running = Counter()
+    peaks = Counter()
+
+    async def job(item):
+        running[item.domain] += 1
+        running['*'] += 1
+        peaks[item.domain] = max(peaks[item.domain], running[item.domain])
+        peaks['*'] = max(peaks['*'], running['*'])
+        await asyncio.sleep(0.01)
+        running[item.domain] -= 1
+        running['*'] -= 1
+
+    items = [SimpleNamespace(domain=domain) for domain in 'aaaaaabbbbbbcc']
+    scheduler = LeechScheduler(workers=4, per_domain=2, limits={'c': 1})
+    assert asyncio.run(scheduler.run(iterate(items), job)) == []
+    assert peaks['a'] == 2
+    assert peaks['b'] == 2
+    assert peaks['c'] == 1
+    assert peaks['*'] <= 4
+
+
+def test_errors_in_items_order():
+    async def job(item):
+        # the first item fails last
+        await asyncio.sleep(item.delay)
+        if item.fails:
+            raise ValueError(item.name)
+
+    items = [
+        SimpleNamespace(name='first', domain='a', delay=0.05, fails=True),
+        SimpleNamespace(name='ok', domain='b', delay=0, fails=False),
+        SimpleNamespace(name='second', domain='c', delay=0, fails=True),
+    ]
+    errors = asyncio.run(LeechScheduler().run(iterate(items), job))
+    assert [str(error) for error in errors] == ['first', 'second']
@@ -7,18 +7,28 @@ from contextlib import asynccontextmanager
 from datetime import datetime
 from enum import Enum
 from functools import wraps
-from io import BytesIO
-from typing import Any, Dict, Generator, List, Optional, Tuple, Type, Union
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple, Type, Union
 
 import aiofile
 import aiohttp
 import bs4 as BeautifulSoup
 import httpx
 from asyncio_pool import AioPool
+from motor.motor_asyncio import AsyncIOMotorCollection
 from motorized import Document, Q, QuerySet
 from motorized.types import PydanticObjectId
 from pydantic import Field
 from pydantic.types import PositiveInt
+from pymongo import ASCENDING, DESCENDING, IndexModel, InsertOne, UpdateOne
+
+from cbz import CbzWriter, CompressionPolicy
+from dirindex import dir_index
+from images import TruncatedImageError
+from journal import PageJournal
+from scheduler import LeechScheduler, leech_run
+from ratelimit import rate_limiter, request_host
+from sessions import ToonSession, sessions
+from workers import validate_page
 
 
 class ToonBaseUrlInvalidError(Exception):
@@ -62,6 +72,7 @@ class Http2Mixin:
     async def get_page_content(self) -> str:
         if self._page_content:
             return self._page_content
+        await self.throttle()
         async with httpx.AsyncClient(http2=True, timeout=10) as client:
             response = await client.get(self.url, headers=self.get_headers(), cookies=self._cookies)
             response.raise_for_status()
@@ -70,6 +81,7 @@ class Http2Mixin:
 
     async def download_links(self, client: httpx.AsyncClient, cbz: zipfile.ZipFile, pair: Tuple[str, str]):
         output_filepath, url = pair
+        await self.throttle()
         if self._no_session:
             response = await httpx.get(url, headers=self.get_headers(), cookies=self._cookies)
         else:
@@ -104,24 +116,73 @@ class SoupMixin:
         return self._soup
 
 
+class BulkWrites:
+    """Collect the writes of a traversal and send them to mongo as a single
+    ordered `bulk_write` on `flush`. The documents get their ids client side
+    when they are queued, so the chapters can point to each other before
+    anything has been sent; the order of the operations guarantees a chapter
+    is always written before another one points to it.
+    """
+    def __init__(self, collection: AsyncIOMotorCollection):
+        self.collection = collection
+        self.operations: List[Union[InsertOne, UpdateOne]] = []
+
+    def __len__(self) -> int:
+        return len(self.operations)
+
+    async def insert(self, document: Document) -> None:
+        document.id = PydanticObjectId()
+        data = await document.to_mongo()
+        data['_id'] = document.id
+        self.operations.append(InsertOne(data))
+
+    def update(self, document: Document, **fields: Any) -> None:
+        self.operations.append(UpdateOne({'_id': document.id}, {'$set': fields}))
+
+    async def flush(self) -> None:
+        if not self.operations:
+            return
+        operations, self.operations = self.operations, []
+        await self.collection.bulk_write(operations, ordered=True)
+
+
 class ToonManager(QuerySet):
     lasts_ordering_selector = ['-created', '-chapter']
 
-    async def lasts(self) -> Generator[None, None, "AsyncToon"]:
-        names: List[str] = await self.distinct('name')
-        for toon_name in names:
-            toon = await self.filter(name=toon_name).order_by(self.lasts_ordering_selector).first()
-            yield toon
+    def lasts_pipeline(self) -> List[Dict[str, Any]]:
+        """Aggregation returning the last chapter of each toon of the query
+        (by `lasts_ordering_selector`), ordered by name.
+        """
+        pipeline: List[Dict[str, Any]] = []
+        if not self._query.is_empty():
+            pipeline.append({'$match': self._query.query})
+        # sorting on the name first lets mongo walk the `name_last` index
+        ordering = [('name', ASCENDING)] + self._sort_instruction(self.lasts_ordering_selector)
+        pipeline.extend([
+            {'$sort': dict(ordering)},
+            {'$group': {'_id': '$name', 'last': {'$first': '$$ROOT'}}},
+            {'$sort': {'_id': 1}},
+            {'$replaceRoot': {'newRoot': '$last'}},
+        ])
+        return pipeline
+
+    async def lasts(self) -> AsyncGenerator["AsyncToon", None]:
+        """Yield the last chapter of each toon from a single aggregation, as
+        the cursor streams them.
+        """
+        # motorized's `aggregate` awaits the cursor, go to motor directly.
+        cursor = self.collection.aggregate(self.lasts_pipeline(), allowDiskUse=True)
+        async for raw_data in cursor:
+            yield self.model(**raw_data)
 
-    async def leech(self) -> list[Exception]:
+    async def leech(self, pool_size: PositiveInt = 3, workers: int = 8, per_domain: int = 2) -> list[Exception]:
         query = Q.raw({"$or": [{"finished": False}, {"finished": {'$exists': False}}]})
-        errors: list[Exception] = []
-        async for toon in self.filter(query).lasts():
-            try:
-                await toon.leech()
-            except Exception as e:
-                errors.append(e)
-        return errors
+        scheduler = LeechScheduler(workers, per_domain)
+        async with leech_run():
+            return await scheduler.run(
+                self.filter(query).lasts(),
+                lambda toon: toon.leech(pool_size)
+            )
 
 
 class AsyncToon(Document):
@@ -137,10 +198,23 @@ class AsyncToon(Document):
     _page_content: Optional[str] = None
     _cookies: aiohttp.CookieJar
     _quote_cookies: bool = True
+    _compression: CompressionPolicy = CompressionPolicy()
+    # requests per second allowed on the domain (None: unlimited)
+    _rate_limit: Optional[float] = None
+    _rate_burst: int = 1
+    # requests per second allowed on each other host (images cdn...)
+    _cdn_rate_limit: Optional[float] = None
 
     class Mongo:
         manager_class = ToonManager
         collection = 'toons'
+        # see indexes.py, the providers Mongo classes only need to declare
+        # the indexes of their own queries.
+        indexes = [
+            IndexModel([('domain', ASCENDING), ('name', ASCENDING), ('episode', ASCENDING)], name='domain_name_episode'),
+            IndexModel([('name', ASCENDING), ('created', DESCENDING), ('chapter', DESCENDING)], name='name_last'),
+            IndexModel([('domain', ASCENDING), ('finished', ASCENDING)], name='domain_finished'),
+        ]
 
     class Config:
         extra = 'allow'
@@ -174,7 +248,7 @@ class AsyncToon(Document):
         raise NotImplementedError
 
     def exists(self) -> bool:
-        return os.path.exists(self.cbz_path)
+        return dir_index.exists(self.cbz_path)
 
     def get_cookies(self) -> Optional[Dict]:
         return None
@@ -202,48 +276,91 @@ class AsyncToon(Document):
         if not os.path.exists(self.path):
             os.mkdir(self.path)
 
-    async def download_links(self, client: aiohttp.ClientSession, cbz: zipfile.ZipFile, pair: Tuple[str, str]) -> None:
+    async def download_links(
+        self,
+        client: ToonSession,
+        cbz: CbzWriter,
+        journal: PageJournal,
+        pair: Tuple[str, str]
+    ) -> None:
         filename, url = pair
-        request = client.get(url, ssl=ssl.SSLContext())
-        async with request as response:
-            response.raise_for_status()
-            page_data: bytes = await response.read()
-            self.check_page_content(page_data)
-            cbz.writestr(filename, page_data)
-            await self._progress()
+        # pages fetched by an interrupted pull are taken back from the journal
+        page_data = journal.get(filename, url)
+        if page_data is not None:
+            valid = await self.validate_page(page_data)
+        else:
+            page_data = await client.fetch(url, ssl=ssl.SSLContext())
+            try:
+                valid = await self.validate_page(page_data)
+            except TruncatedImageError:
+                # the transfer was cut, give the page one more chance
+                page_data = await client.fetch(url, ssl=ssl.SSLContext())
+                valid = await self.validate_page(page_data)
+            if valid:
+                journal.record(filename, url, page_data)
+        if not valid:
+            # the chapter is still committed, say which page it lacks
+            await self.log(f'\nskipped {filename}, not an image: {url}\n')
+            return
+        await cbz.write_async(filename, page_data)
+        await self._progress()
+
+    async def validate_page(self, page_data: bytes) -> bool:
+        """return False if the page content does not look like an image.
+
+        raises:
+        - images.TruncatedImageError if the page is incomplete
+        """
+        self.check_page_content(page_data)
+        return await validate_page(page_data)
 
     async def pull(self, pool_size=3) -> None:
         assert self.name
         await self.create_folder()
         await self.log(f'{self}: ')
 
-        cbz_io = BytesIO()
         pool = AioPool(size=pool_size)
         pages = await self.get_pages()
         if not pages:
             await self.log('No content', end='\n')
             return None
         pair_list: List[Tuple[str, str]] = list([(f'{index:03}.jpg', url) for index, url in enumerate(pages)])
-        cbz = zipfile.ZipFile(cbz_io, 'w', zipfile.ZIP_DEFLATED)
-        async with self.get_client() as client:
-            download_coroutine = lambda pair: self.download_links(client, cbz, pair)
-            raise_on_any_error_from_pool(await pool.map(download_coroutine, pair_list))
-        cbz.close()
-        # async with aiofile.async_open(self.cbz_path, 'wb') as afp:
-        #     await afp.write(cbz_io.read())
-        cbz_io.seek(0)
-        with open(self.cbz_path, 'wb') as fp:
-            fp.write(cbz_io.read())
+        with PageJournal(self.cbz_path) as journal, CbzWriter(self.cbz_path, self._compression) as cbz:
+            async with self.get_client() as client:
+                download_coroutine = lambda pair: self.download_links(client, cbz, journal, pair)
+                raise_on_any_error_from_pool(await pool.map(download_coroutine, pair_list))
+            cbz.save()
+            journal.discard()
         await self.log('\n')
 
     @asynccontextmanager
     async def get_client(self):
+        # inside a run we reuse the domain's session to keep connections alive
+        if sessions.active:
+            yield sessions.client(
+                self.domain,
+                self.get_headers(),
+                self.get_cookies(),
+                self._quote_cookies,
+                self.throttle
+            )
+            return
         session = aiohttp.ClientSession(
             headers=self.get_headers(),
             cookie_jar=self._cookies,
         )
         async with session as client:
-            yield client
+            yield ToonSession(client, throttle=self.throttle, domain=self.domain)
+
+    async def throttle(self, url: Optional[str] = None) -> None:
+        """Wait for the rate limit of the request's host (`_rate_limit`
+        requests per second with bursts of `_rate_burst` on the domain,
+        `_cdn_rate_limit` on the other hosts), must be awaited before any
+        request.
+        """
+        host = request_host(url, self.domain)
+        rate = self._rate_limit if host == self.domain else self._cdn_rate_limit
+        await rate_limiter.acquire(host, rate, self._rate_burst)
 
     async def _progress(self):
         """Called each time a page has been downloaded successfully
@@ -261,50 +378,68 @@ class AsyncToon(Document):
         if self._page_content:
             return self._page_content
         async with self.get_client() as client:
-            request = client.get(url=self.url, ssl=ssl.SSLContext())
-            async with request as response:
-                if response.status == 403:
-                    print(await response.read())
-                response.raise_for_status()
-                page_content = await response.read()
+            page_content = await client.fetch(self.url, ssl=ssl.SSLContext())
         self._page_content = page_content
         return page_content
 
     def check_page_content(self, page_data: bytes) -> None:
         """Receive the actual data from the page after the fetch
-        this function is here to be overided by custom checks
+        this function is here to be overided by custom checks,
+        the images themselves are validated by `validate_page`.
         """
         pass
 
     async def load_extra_attributes(self, new_toon):
         pass
 
-    async def leech(self, pool_size: PositiveInt = 3) -> None:
+    async def leech(self, pool_size: PositiveInt = 3, flush_every: int = 50) -> None:
+        """Pull the chapters from this one, following `get_next`.
+        The database writes are queued and flushed every `flush_every`
+        operations and when the traversal ends, even on error.
+        """
         await self.log(f' --- {self.name} ---', end='\n')
+        # every chapter of the toon we already know, instead of one query
+        # per chapter.
+        known: Dict[Any, AsyncToon] = {}
+        async for chapter in self.objects.filter(name=self.name):
+            known[chapter.episode] = chapter
+        writes = BulkWrites(self.objects.collection)
         toon = self
-        while toon:
-            # if the toon does not exists on disk we pull it and save it in db
-            if not toon.exists():
-                await toon.pull(pool_size=pool_size)
-                if not await toon.objects.filter(name=toon.name, episode=toon.episode).exists():
-                    await toon.save()
-
-            next_toon: Optional[AsyncToon] = await toon.get_next()
-            if next_toon:
-                # look in the db if we already know the next toon, if so we use it directly
-                next_toon_in_db: Optional[AsyncToon] = await self.objects.filter(name=next_toon.name, episode=next_toon.episode).first()
-                if next_toon_in_db:
-                    next_toon = next_toon_in_db
-                    await self.load_extra_attributes(next_toon)
-                # otherwise save the new one
-                else:
-                    next_toon.corporate = toon.corporate
-                    await next_toon.save()
-                toon.next = next_toon.id
-                await toon.save()
-
-            # ready for next iteration on the loop
-            toon = next_toon
+        try:
+            while toon:
+                # if the toon does not exists on disk we pull it and save it in db
+                if not toon.exists():
+                    await toon.pull(pool_size=pool_size)
+                    if toon.episode not in known:
+                        await writes.insert(toon)
+                        known[toon.episode] = toon
+
+                next_toon: Optional[AsyncToon] = await toon.get_next()
+                if next_toon:
+                    # if we already know the next toon we use it directly
+                    next_toon_in_db: Optional[AsyncToon] = known.get(next_toon.episode)
+                    if next_toon_in_db:
+                        next_toon = next_toon_in_db
+                        await self.load_extra_attributes(next_toon)
+                    # otherwise save the new one
+                    else:
+                        next_toon.corporate = toon.corporate
+                        await writes.insert(next_toon)
+                        known[next_toon.episode] = next_toon
+                    if toon.id is None:
+                        toon.next = next_toon.id
+                        await writes.insert(toon)
+                        known[toon.episode] = toon
+                    elif toon.next != next_toon.id:
+                        toon.next = next_toon.id
+                        writes.update(toon, next=toon.next)
+
+                if len(writes) >= flush_every:
+                    await writes.flush()
+                # ready for next iteration on the loop
+                toon = next_toon
+        finally:
+            await writes.flush()
 
     async def rename(self, newname) -> None:
         if newname == self.name:
@@ -0,0 +1,53 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+from images import check_image, decode
+from runscope import RunScoped
+
+
+class CpuPool(RunScoped):
+    """Process pool, sized on the core count, for the cpu bound work of the
+    pulls (the full decode of the strict pages) so the event loop only deals
+    with the network.
+
+    Outside of a run (`async with cpu_pool:`) the work is done inline.
+    """
+    def __init__(self, workers: Optional[int] = None):
+        self.workers = workers or os.cpu_count() or 1
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        if not self.active:
+            return func(*args, **kwargs)
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    async def close(self) -> None:
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            # the workers may still be decoding, wait for them off the loop
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+
+cpu_pool = CpuPool()
+
+
+async def validate_page(data: bytes, strict: bool = False) -> bool:
+    """Tell if `data` is a complete image from its headers, which is cheap
+    enough for the loop, only the full decode of `strict` goes to the
+    `cpu_pool`.
+    return False if `data` is not an image.
+
+    raises:
+    - images.TruncatedImageError if the page is incomplete
+    """
+    if not check_image(data):
+        return False
+    if strict:
+        return await cpu_pool.run(decode, data)
+    return True